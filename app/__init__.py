@@ -0,0 +1,6 @@
+"""Agency API backend."""
+
+import time
+
+# Reference point for the "import" phase of the startup report.
+IMPORT_STARTED = time.perf_counter()
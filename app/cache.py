@@ -0,0 +1,188 @@
+"""Read-through cache for item and list reads, invalidated on writes."""
+
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+
+class CacheBackend(ABC):
+    """Storage for cached reads, grouped by table for invalidation.
+
+    Values are opaque to the backend. A shared backend (e.g. Redis) only has
+    to implement these methods to replace the in-process one.
+    """
+
+    @abstractmethod
+    def get(self, table: str, key: Hashable) -> Any | None:
+        """Return the cached value, or ``None`` on a miss."""
+
+    @abstractmethod
+    def generation(self, table: str) -> int:
+        """Return a counter that changes whenever ``table`` is invalidated."""
+
+    @abstractmethod
+    def set(
+        self, table: str, key: Hashable, value: Any, generation: int | None = None
+    ) -> None:
+        """Store ``value`` under ``key`` for ``table``.
+
+        With ``generation`` (read before the value was computed), nothing is
+        stored if ``table`` was invalidated since: the value may predate a
+        write whose invalidation has already run.
+        """
+
+    @abstractmethod
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """Drop every entry cached for ``tables``."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    @abstractmethod
+    def stats(self) -> dict[str, Any]:
+        """Return counters used to size the cache."""
+
+
+class NullCache(CacheBackend):
+    """Backend used when caching is disabled: every lookup misses."""
+
+    def get(self, table: str, key: Hashable) -> Any | None:
+        return None
+
+    def generation(self, table: str) -> int:
+        return 0
+
+    def set(
+        self, table: str, key: Hashable, value: Any, generation: int | None = None
+    ) -> None:
+        pass
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": "none"}
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU cache with a time-to-live.
+
+    Entries are invalidated when this process writes to their table; writes
+    made by other workers or outside the API are picked up once ``ttl``
+    seconds have passed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, Any]] = OrderedDict()
+        self._keys_by_table: dict[str, set[tuple[str, Hashable]]] = {}
+        # Invalidation counter, and its value at each table's last
+        # invalidation and at the last clear().
+        self._clock = 0
+        self._invalidated_at: dict[str, int] = {}
+        self._cleared_at = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, table: str, key: Hashable) -> Any | None:
+        entry_key = (table, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                self._remove(entry_key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self._hits += 1
+            return value
+
+    def generation(self, table: str) -> int:
+        with self._lock:
+            return self._generation(table)
+
+    def set(
+        self, table: str, key: Hashable, value: Any, generation: int | None = None
+    ) -> None:
+        entry_key = (table, key)
+        with self._lock:
+            if generation is not None and generation != self._generation(table):
+                return
+            self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(entry_key)
+            self._keys_by_table.setdefault(table, set()).add(entry_key)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = next(iter(self._entries.items()))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            self._clock += 1
+            for table in tables:
+                self._invalidated_at[table] = self._clock
+                for entry_key in self._keys_by_table.pop(table, ()):
+                    self._entries.pop(entry_key, None)
+                    self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clock += 1
+            self._cleared_at = self._clock
+            self._invalidated_at.clear()
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_table.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+    def _generation(self, table: str) -> int:
+        # Called with self._lock held.
+        return max(self._invalidated_at.get(table, 0), self._cleared_at)
+
+    def _remove(self, entry_key: tuple[str, Hashable]) -> None:
+        self._entries.pop(entry_key, None)
+        keys = self._keys_by_table.get(entry_key[0])
+        if keys is not None:
+            keys.discard(entry_key)
+
+
+def create_cache(backend: str, max_entries: int, ttl: float) -> CacheBackend:
+    """Build the backend named by the READ_CACHE setting."""
+    if backend in {"", "none", "off"}:
+        return NullCache()
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unknown READ_CACHE backend: {backend!r}")
@@ -1,9 +1,23 @@
-from collections.abc import Generator
+import threading
+import time
+from collections.abc import AsyncIterator, Generator
+from functools import lru_cache
+from typing import Any
 
 from sqlalchemy import MetaData, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import get_settings
+from .sql_timing import SlowQueryLog, instrument_engine
 
 settings = get_settings()
 metadata = MetaData(schema="agency")
@@ -15,9 +29,151 @@ class Base(DeclarativeBase):
     metadata = metadata
 
 
-engine = create_engine(settings.database_url, echo=False, future=True)
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool grows, which is
+    the latency a request actually sees.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return connection
+
+    def stats(self) -> dict[str, Any]:
+        """Return occupancy and checkout wait counters for this process."""
+        with self._stats_lock:
+            checkouts = self._checkouts
+            wait_total = self._wait_total
+            wait_max = self._wait_max
+            timeouts = self._timeouts
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_s": self._timeout,
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_total_ms": round(wait_total * 1000, 3),
+            "wait_avg_ms": round(wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+            "wait_max_ms": round(wait_max * 1000, 3),
+        }
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """Timed pool for the asyncio engine."""
+
+
+def _pool_options() -> dict[str, Any]:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> Engine:
+    """Create the engine on first use so importing the app performs no I/O."""
+    engine = create_engine(
+        settings.database_url,
+        echo=False,
+        future=True,
+        poolclass=TimedQueuePool,
+        **_pool_options(),
+    )
+    instrument_engine(engine, slow_queries)
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    """Create the asyncio engine (psycopg's async driver) on first use."""
+    engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        poolclass=TimedAsyncQueuePool,
+        **_pool_options(),
+    )
+    instrument_engine(engine.sync_engine, slow_queries)
+    return engine
+
+
+# Plans are captured from a background thread, which needs the sync engine
+# even when requests are served by the asyncio one.
+slow_queries = SlowQueryLog(
+    threshold=settings.slow_query_threshold,
+    explain_rate=settings.slow_query_explain_rate,
+    explain_engine=get_engine,
+)
+
+
+def active_engine() -> Engine:
+    """Return the sync engine whose pool serves requests in the current mode."""
+    return get_async_engine().sync_engine if settings.db_async else get_engine()
+
+
+def warm_pool(engine: Engine, count: int) -> int:
+    """Open up to ``count`` pooled connections at once and return them idle.
+
+    Connections are held simultaneously so the pool ends up with ``count``
+    distinct established connections rather than reusing the first one.
+    Returns the number of connections opened.
+    """
+    count = max(0, min(count, settings.db_pool_size))
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def warm_async_pool(engine: AsyncEngine, count: int) -> int:
+    """Asyncio counterpart of :func:`warm_pool`."""
+    count = max(0, min(count, settings.db_pool_size))
+    connections = []
+    try:
+        for _ in range(count):
+            connection = await engine.connect()
+            connections.append(connection)
+            await connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+
+# Sessions are bound per call (``SessionLocal(bind=get_engine())``) to keep
+# engine creation lazy.
 SessionLocal = sessionmaker(
-    bind=engine,
     autoflush=False,
     autocommit=False,
     expire_on_commit=False,
@@ -27,8 +183,21 @@ SessionLocal = sessionmaker(
 
 def get_session() -> Generator[Session, None, None]:
     """Yield a database session for FastAPI dependency injection."""
-    session: Session = SessionLocal()
+    session: Session = SessionLocal(bind=get_engine())
     try:
         yield session
     finally:
         session.close()
+
+
+AsyncSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Yield an asyncio session for FastAPI dependency injection."""
+    async with AsyncSessionLocal(bind=get_async_engine()) as session:
+        yield session
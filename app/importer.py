@@ -0,0 +1,164 @@
+"""Bulk import of CSV/NDJSON uploads through ``COPY ... FROM STDIN``."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import Iterator
+from typing import IO, Any
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import CheckConstraint, ForeignKeyConstraint, Table, text
+from sqlalchemy.orm import Session
+
+from .schemas import ImportRejectedRow, ImportReport
+
+# Staging column holding the source line of each copied row.
+LINE_COLUMN = "import_line"
+
+
+def iter_records(
+    upload: IO[bytes], ndjson: bool
+) -> Iterator[tuple[int, dict[str, Any] | str]]:
+    """Yield ``(line, record)`` pairs; unparsable records are yielded as text."""
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    if ndjson:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_number, f"Invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, "Each line must be a JSON object"
+                continue
+            yield line_number, record
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            # Empty CSV fields mean NULL, as with COPY's CSV format.
+            yield reader.line_num, {
+                key: (value if value != "" else None)
+                for key, value in record.items()
+                if key is not None
+            }
+    stream.detach()
+
+
+def import_records(
+    session: Session,
+    table: Table,
+    schema: type[BaseModel],
+    records: Iterator[tuple[int, dict[str, Any] | str]],
+    max_rejected: int,
+) -> ImportReport:
+    """Validate ``records`` and load them into ``table`` via a staging table.
+
+    Valid rows are written with ``COPY ... FROM STDIN`` into a temporary table
+    shaped like the target (without its constraints), then merged with a
+    single ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``. Rows are copied
+    as soon as they are validated, so memory use does not grow with the file.
+    ``ON CONFLICT`` only absorbs unique violations, so staged rows that would
+    break a foreign key or CHECK constraint are removed and rejected first.
+    The caller commits.
+    """
+    preparer = session.get_bind().dialect.identifier_preparer
+    columns = list(schema.model_fields)
+    column_list = ", ".join(preparer.quote(column) for column in columns)
+    target = preparer.format_table(table)
+    staging = preparer.quote(f"import_{table.name}")
+
+    # Every target column is staged, so CHECK expressions can be evaluated
+    # as written; the ones not imported stay NULL, which passes them.
+    session.execute(
+        text(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT *, 0 AS {LINE_COLUMN} FROM {target} WITH NO DATA"
+        )
+    )
+    report = ImportReport()
+    raw = session.connection().connection.driver_connection
+    with raw.cursor() as cursor:
+        copy_sql = f"COPY {staging} ({column_list}, {LINE_COLUMN}) FROM STDIN"
+        with cursor.copy(copy_sql) as copy:
+            for line, record in records:
+                report.received += 1
+                if isinstance(record, str):
+                    _reject(report, line, record, max_rejected)
+                    continue
+                try:
+                    values = schema.model_validate(record).model_dump()
+                except ValidationError as exc:
+                    _reject(report, line, exc.errors(include_url=False), max_rejected)
+                    continue
+                copy.write_row((*(values[column] for column in columns), line))
+    _reject_constraint_violations(session, table, staging, report, max_rejected)
+    report.rejected_rows.sort(key=lambda row: row.line)
+    copied = report.received - report.rejected
+    result = session.execute(
+        text(
+            f"INSERT INTO {target} ({column_list}) "
+            f"SELECT {column_list} FROM {staging} ON CONFLICT DO NOTHING"
+        )
+    )
+    report.inserted = result.rowcount
+    report.skipped = copied - report.inserted
+    return report
+
+
+def _reject_constraint_violations(
+    session: Session,
+    table: Table,
+    staging: str,
+    report: ImportReport,
+    max_rejected: int,
+) -> None:
+    """Delete staged rows failing a foreign key or CHECK and reject them."""
+    preparer = session.get_bind().dialect.identifier_preparer
+    for constraint in sorted(table.constraints, key=lambda c: c.name or ""):
+        if isinstance(constraint, ForeignKeyConstraint):
+            local = [preparer.quote(column.name) for column in constraint.columns]
+            remote = [
+                preparer.quote(element.column.name) for element in constraint.elements
+            ]
+            # MATCH SIMPLE: a key with a NULL column references nothing.
+            present = " AND ".join(f"s.{column} IS NOT NULL" for column in local)
+            matches = " AND ".join(
+                f"r.{theirs} = s.{ours}" for ours, theirs in zip(local, remote)
+            )
+            referred = preparer.format_table(constraint.referred_table)
+            condition = (
+                f"{present} AND NOT EXISTS "
+                f"(SELECT 1 FROM {referred} r WHERE {matches})"
+            )
+            key = f"concat_ws(', ', {', '.join(f's.{column}' for column in local)})"
+            names = ", ".join(column.name for column in constraint.columns)
+            name = constraint.name or f"{table.name}_{names.replace(', ', '_')}_fkey"
+            # Worded like PostgreSQL's own error, with the key filled in below.
+            detail = (
+                f'violates foreign key constraint "{name}": Key ({names})=({{}}) '
+                f'is not present in table "{constraint.referred_table.name}"'
+            )
+        elif isinstance(constraint, CheckConstraint):
+            condition = f"NOT ({constraint.sqltext})"
+            key = "NULL"
+            detail = f'violates check constraint "{constraint.name}"'
+        else:
+            continue
+        rows = session.execute(
+            text(
+                f"DELETE FROM {staging} s WHERE {condition} "
+                f"RETURNING s.{LINE_COLUMN}, {key}"
+            )
+        ).all()
+        for line, key_value in sorted(rows):
+            _reject(report, line, detail.format(key_value), max_rejected)
+
+
+def _reject(report: ImportReport, line: int, detail: Any, max_rejected: int) -> None:
+    report.rejected += 1
+    if len(report.rejected_rows) < max_rejected:
+        report.rejected_rows.append(ImportRejectedRow(line=line, detail=detail))
@@ -0,0 +1,275 @@
+"""Typed filter and sort query language for the generated list routes.
+
+Query parameters name a column and an optional operator::
+
+    ?price__gte=100&date__between=2025-01-01,2025-03-31&genre__in=rock,jazz
+    &sort=-date,id
+
+Values are converted with the column's Python type and always sent as bound
+parameters. Statements are compiled once per *shape* (columns, operators,
+sort order and cursor layout) and reused with new values, so repeated
+requests skip parsing and statement construction.
+
+Pagination is keyset-based: the cursor holds the sort values of the last
+row returned (plus its id, which always breaks ties), and the next page
+continues strictly after it in the requested order.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_jsonable_python
+from sqlalchemy import Column, Table, and_, bindparam, false, or_, select
+from sqlalchemy.sql import ColumnElement, Select
+
+# Query parameters of the list routes that are not column filters.
+RESERVED_PARAMS = frozenset({"limit", "after_id", "cursor", "stream", "fields", "sort"})
+
+COMPARISONS = {"eq", "ne", "gt", "gte", "lt", "lte"}
+TEXT_OPERATORS = {"contains", "startswith"}
+OPERATORS = COMPARISONS | TEXT_OPERATORS | {"in", "between", "isnull"}
+
+DEFAULT_SORT: tuple[tuple[str, bool], ...] = (("id", False),)
+
+
+class QueryError(ValueError):
+    """Raised for filters, sorts or cursors that do not fit the table."""
+
+
+@dataclass(frozen=True)
+class ListQuery:
+    """A parsed list request: its shape plus the values to bind."""
+
+    filters: tuple[tuple[str, str], ...]
+    sort: tuple[tuple[str, bool], ...]
+    values: tuple[Any, ...]
+
+    @property
+    def custom_sort(self) -> bool:
+        return self.sort != DEFAULT_SORT
+
+    @property
+    def sort_columns(self) -> tuple[str, ...]:
+        return tuple(name for name, _ in self.sort)
+
+    def params(self, cursor: list[Any] | None = None) -> dict[str, Any]:
+        """Return the bind parameters for :func:`compile_list_query`."""
+        params: dict[str, Any] = {}
+        for index, ((_, operator), value) in enumerate(zip(self.filters, self.values)):
+            if operator == "between":
+                params[f"f{index}_low"], params[f"f{index}_high"] = value
+            elif value is not None:
+                params[f"f{index}"] = value
+        for index, value in enumerate(cursor or ()):
+            if value is not None:
+                params[f"c{index}"] = value
+        return params
+
+
+def like_pattern(query: str, prefix: bool) -> str:
+    """Escape LIKE wildcards in ``query`` and anchor it as a prefix or substring."""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix else f"%{escaped}%"
+
+
+@lru_cache(maxsize=None)
+def _adapter(python_type: type) -> TypeAdapter:
+    return TypeAdapter(python_type)
+
+
+def _python_type(column: Column) -> type:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return str
+
+
+def coerce_value(column: Column, raw: Any) -> Any:
+    """Convert ``raw`` (text or JSON) to the column's Python type."""
+    python_type = _python_type(column)
+    if python_type is str:
+        return str(raw)
+    try:
+        return _adapter(python_type).validate_python(raw)
+    except ValidationError as exc:
+        raise QueryError(
+            f"Invalid {python_type.__name__} value for {column.key!r}: {raw!r}"
+        ) from exc
+
+
+def _column(table: Table, name: str) -> Column:
+    column = table.columns.get(name)
+    if column is None:
+        raise QueryError(f"Unknown column {name!r} for table {table.name!r}")
+    return column
+
+
+def _parse_filter(column: Column, operator: str, raw: str) -> tuple[str, Any]:
+    if operator in TEXT_OPERATORS:
+        if _python_type(column) is not str:
+            raise QueryError(f"{operator!r} only applies to text columns")
+        return operator, like_pattern(raw, prefix=operator == "startswith")
+    if operator == "isnull":
+        try:
+            flag = _adapter(bool).validate_python(raw)
+        except ValidationError as exc:
+            raise QueryError(f"isnull on {column.key!r} expects true or false") from exc
+        return ("isnull" if flag else "notnull"), None
+    if operator == "in":
+        return operator, [coerce_value(column, item) for item in raw.split(",")]
+    if operator == "between":
+        bounds = raw.split(",")
+        if len(bounds) != 2:
+            raise QueryError(f"between on {column.key!r} needs two comma-separated values")
+        return operator, tuple(coerce_value(column, bound) for bound in bounds)
+    return operator, coerce_value(column, raw)
+
+
+def parse_sort(table: Table, sort: str | None) -> tuple[tuple[str, bool], ...]:
+    """Parse ``sort=-date,id`` into ``(column, descending)`` pairs ending in id."""
+    if not sort:
+        return DEFAULT_SORT
+    order: list[tuple[str, bool]] = []
+    seen: set[str] = set()
+    for item in sort.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        descending = item.startswith("-")
+        name = item.lstrip("+-")
+        _column(table, name)
+        if name not in seen:
+            seen.add(name)
+            order.append((name, descending))
+    if "id" not in seen:
+        order.append(("id", False))
+    return tuple(order)
+
+
+def parse_list_query(
+    table: Table, query_params: Iterable[tuple[str, str]], sort: str | None
+) -> ListQuery:
+    """Parse every non-reserved query parameter as a ``column[__operator]`` filter."""
+    parsed: list[tuple[tuple[str, str], Any]] = []
+    for key, raw in query_params:
+        if key in RESERVED_PARAMS:
+            continue
+        name, _, operator = key.partition("__")
+        operator = operator or "eq"
+        if operator not in OPERATORS:
+            raise QueryError(f"Unknown operator {operator!r} in {key!r}")
+        operator, value = _parse_filter(_column(table, name), operator, raw)
+        parsed.append(((name, operator), value))
+    # A stable order makes equivalent requests share one compiled statement.
+    parsed.sort(key=lambda item: item[0])
+    return ListQuery(
+        filters=tuple(shape for shape, _ in parsed),
+        sort=parse_sort(table, sort),
+        values=tuple(value for _, value in parsed),
+    )
+
+
+def encode_cursor(row: dict[str, Any], sort: tuple[tuple[str, bool], ...]) -> str:
+    values = to_jsonable_python([row[name] for name, _ in sort])
+    token = base64.urlsafe_b64encode(json.dumps(values).encode("utf-8"))
+    return token.decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    table: Table, sort: tuple[tuple[str, bool], ...], token: str
+) -> list[Any]:
+    """Decode a cursor produced by :func:`encode_cursor` for the same sort."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise QueryError("Malformed cursor") from exc
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise QueryError("Cursor does not match the requested sort")
+    return [
+        None if value is None else coerce_value(table.columns[name], value)
+        for (name, _), value in zip(sort, values)
+    ]
+
+
+def _condition(column: Column, operator: str, param: str) -> ColumnElement:
+    if operator == "in":
+        return column.in_(bindparam(param, expanding=True))
+    if operator == "between":
+        return column.between(bindparam(f"{param}_low"), bindparam(f"{param}_high"))
+    if operator == "isnull":
+        return column.is_(None)
+    if operator == "notnull":
+        return column.is_not(None)
+    if operator in TEXT_OPERATORS:
+        # ILIKE on the bare column keeps the trigram GIN indexes usable.
+        return column.ilike(bindparam(param), escape="\\")
+    value = bindparam(param)
+    return {
+        "eq": column == value,
+        "ne": column != value,
+        "gt": column > value,
+        "gte": column >= value,
+        "lt": column < value,
+        "lte": column <= value,
+    }[operator]
+
+
+def _after_cursor(
+    table: Table, sort: tuple[tuple[str, bool], ...], cursor_nulls: tuple[bool, ...]
+) -> ColumnElement:
+    """Rows strictly after the cursor in ``ORDER BY`` order.
+
+    Expands ``(a, b, id) > (:c0, :c1, :c2)`` per column so mixed directions
+    work, with NULLs sorting last ascending and first descending (the
+    PostgreSQL default, which matches plain btree indexes).
+    """
+    branches: list[ColumnElement] = []
+    equal: list[ColumnElement] = []
+    for index, ((name, descending), is_null) in enumerate(zip(sort, cursor_nulls)):
+        column = table.columns[name]
+        if is_null:
+            beyond = column.is_not(None) if descending else None
+            same = column.is_(None)
+        else:
+            value = bindparam(f"c{index}", type_=column.type)
+            beyond = column < value if descending else column > value
+            if column.nullable and not descending:
+                beyond = or_(beyond, column.is_(None))
+            same = column == value
+        if beyond is not None:
+            branches.append(and_(*equal, beyond))
+        equal.append(same)
+    return or_(*branches) if branches else false()
+
+
+@lru_cache(maxsize=512)
+def compile_list_query(
+    table: Table,
+    columns: tuple[str, ...],
+    filters: tuple[tuple[str, str], ...],
+    sort: tuple[tuple[str, bool], ...],
+    cursor_nulls: tuple[bool, ...] | None,
+) -> Select:
+    """Build the select for one query shape; values are bound at execution."""
+    stmt = select(*(table.columns[name] for name in columns))
+    for index, (name, operator) in enumerate(filters):
+        stmt = stmt.where(_condition(table.columns[name], operator, f"f{index}"))
+    if cursor_nulls is not None:
+        stmt = stmt.where(_after_cursor(table, sort, cursor_nulls))
+    order_by = []
+    for name, descending in sort:
+        column = table.columns[name]
+        clause = column.desc() if descending else column.asc()
+        if column.nullable:
+            clause = clause.nulls_first() if descending else clause.nulls_last()
+        order_by.append(clause)
+    return stmt.order_by(*order_by)
@@ -1,26 +1,73 @@
-from __future__ import annotations
-
+import asyncio
 import csv
+import inspect
+import io
+import logging
 import os
+import re
 import subprocess
-from dataclasses import dataclass
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from datetime import date
 from pathlib import Path
+from collections.abc import AsyncIterator, Callable, Iterator, Mapping, Sequence
 from typing import Any
 
-from fastapi import Depends, FastAPI, HTTPException, Query
-from sqlalchemy import String, cast, select, text
-from sqlalchemy.engine import URL, make_url
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+import psycopg
+from fastapi import APIRouter, Body, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.engine import URL, Connection, make_url
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.sql import Select
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
 
-from . import models, schemas
+from . import IMPORT_STARTED, migrations, models, schemas
+from .cache import create_cache
 from .config import get_settings
-from .database import Base, engine, get_session
+from .database import (
+    AsyncSessionLocal,
+    SessionLocal,
+    TimedQueuePool,
+    active_engine,
+    get_async_engine,
+    get_async_session,
+    get_engine,
+    get_session,
+    warm_async_pool,
+    warm_pool,
+)
+from .importer import import_records, iter_records
+from .list_query import (
+    QueryError,
+    compile_list_query,
+    decode_cursor,
+    encode_cursor,
+    like_pattern,
+    parse_list_query,
+)
+from .metrics import MetricsMiddleware, MetricsRegistry, MetricsStore, Sample, render
+from .pg_copy import copy_csv_to_file, iter_copy_csv
+from .query_cursors import CursorLimitError, CursorRegistry, cursor_owner
+from .relations import RELATIONS, Relation, link_pairs, unlink_pairs
+from .reports import REPORTS, Report, read_report, refresh_report, report_freshness
+from .result_store import ResultStore
+from .search import SEARCH_LABELS, build_search, prefix_tsquery
+from .sql_timing import ServerTimingMiddleware
+from .startup import startup_report
+from .tickets import CAPACITY_CONSTRAINT, SEAT_INDEX, issue_tickets
 
 settings = get_settings()
-Base.metadata.create_all(bind=engine)
-app = FastAPI(title="Agency API", version="1.0.0")
+logger = logging.getLogger(__name__)
+router = APIRouter()
 
 
 @dataclass(frozen=True)
@@ -29,6 +76,73 @@ class TableConfig:
     create_schema: type[BaseModel]
     update_schema: type[BaseModel]
     read_schema: type[BaseModel]
+    list_adapter: TypeAdapter = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Built once per table so reads validate and serialize in a single pass.
+        object.__setattr__(self, "list_adapter", TypeAdapter(list[self.read_schema]))
+
+    @property
+    def columns(self) -> list[Any]:
+        return list(self.model.__table__.columns)
+
+
+@dataclass(frozen=True)
+class Projection:
+    """A subset of a table's columns with a serializer built for it."""
+
+    columns: tuple[Any, ...]
+    read_schema: type[BaseModel]
+    list_adapter: TypeAdapter
+
+
+# What the read helpers need: a full table or a projection of it.
+TableView = TableConfig | Projection
+
+
+@lru_cache(maxsize=256)
+def _projection(config: TableConfig, names: tuple[str, ...]) -> Projection:
+    read_schema = config.read_schema
+    schema = create_model(
+        f"{read_schema.__name__}Projection",
+        __config__=read_schema.model_config,
+        **{
+            name: (field_info.annotation, field_info)
+            for name, field_info in read_schema.model_fields.items()
+            if name in names
+        },
+    )
+    columns = tuple(column for column in config.columns if column.key in names)
+    return Projection(columns, schema, TypeAdapter(list[schema]))
+
+
+def _table_view(
+    config: TableConfig, fields: str | None, required: tuple[str, ...] = ("id",)
+) -> TableView:
+    """Resolve a ``fields=a,b`` parameter into the columns to select.
+
+    The ``required`` columns (the primary key, plus sort keys that the next
+    page cursor is built from) are always included; unknown names are
+    rejected.
+    """
+    if not fields:
+        return config
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    known = {column.key for column in config.columns}
+    unknown = requested - known
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    requested.update(required)
+    if requested == known:
+        return config
+    names = tuple(column.key for column in config.columns if column.key in requested)
+    return _projection(config, names)
+
+
+FIELDS_DESCRIPTION = "Comma-separated columns to return (id is always included)"
+SORT_DESCRIPTION = "Comma-separated sort columns, '-' prefix for descending"
 
 
 TABLE_CONFIGS: dict[str, TableConfig] = {
@@ -67,20 +181,400 @@ TABLE_CONFIGS: dict[str, TableConfig] = {
     ),
 }
 
-last_query_result: dict[str, list[Any]] = {"columns": [], "rows": []}
+query_cursors = CursorRegistry(
+    max_open=settings.sql_cursor_max_open, idle_timeout=settings.sql_cursor_idle_timeout
+)
+
+RESULT_HANDLE_HEADER = "X-Result-Handle"
+CLIENT_ID_HEADER = "X-Client-Id"
+
+result_store = ResultStore(
+    directory=settings.result_store_dir,
+    ttl=settings.result_store_ttl,
+    memory_limit=settings.result_store_memory_limit,
+    max_per_client=settings.result_store_max_per_client,
+    flush_interval=settings.result_store_flush_interval,
+)
+
+
+def _client_key(request: Request) -> str:
+    """Identify the caller for the "last result" fallback of the CSV export."""
+    client_id = request.headers.get(CLIENT_ID_HEADER)
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+def _remember_result(
+    request: Request,
+    columns: list[str],
+    rows: list[dict[str, Any]],
+    size: int | None = None,
+) -> str:
+    """Store a result for CSV export and return its handle."""
+    return result_store.put(columns, rows, _client_key(request), size)
+
+
+def _store_last_query(
+    request: Request,
+    response: Response,
+    config: TableView,
+    rows: list[dict[str, Any]],
+) -> None:
+    """Cache the query result for CSV export and expose its handle."""
+    columns = [column.key for column in config.columns]
+    response.headers[RESULT_HANDLE_HEADER] = _remember_result(
+        request, columns, rows, len(response.body)
+    )
+
+
+read_cache = create_cache(
+    settings.read_cache, settings.read_cache_max_entries, settings.read_cache_ttl
+)
+# Response headers replayed together with a cached body.
+CACHED_HEADERS = ("ETag", "Cache-Control", "Link", "X-Next-Cursor")
+
+
+@dataclass(frozen=True)
+class CachedRead:
+    """A serialized list or item response kept in ``read_cache``."""
+
+    body: bytes
+    headers: dict[str, str]
+    rows: list[dict[str, Any]]
+
+
+def _read_cache_key(kind: str, request: Request, *parts: Any) -> tuple[Any, ...]:
+    return (kind, *parts, tuple(sorted(request.query_params.multi_items())))
+
+
+def _cache_read(
+    table_name: str,
+    key: tuple[Any, ...],
+    response: Response,
+    rows: list[dict[str, Any]],
+    generation: int,
+) -> None:
+    """Cache a read unless ``table_name`` was invalidated since ``generation``.
+
+    ``generation`` is taken before querying, so a read that raced a write is
+    never cached after the write's invalidation has run.
+    """
+    headers = {
+        name: response.headers[name] for name in CACHED_HEADERS if name in response.headers
+    }
+    read_cache.set(
+        table_name, key, CachedRead(bytes(response.body), headers, rows), generation
+    )
+
+
+def _replay_cached_read(
+    request: Request, config: TableView, cached: CachedRead
+) -> Response:
+    etag = cached.headers.get("ETag")
+    if etag and _etag_matches(request, etag):
+        return _set_etag(Response(status_code=304), etag)
+    response = Response(cached.body, media_type="application/json", headers=cached.headers)
+    _store_last_query(request, response, config, cached.rows)
+    return response
+
+
+@lru_cache(maxsize=None)
+def _dependent_tables(table_name: str) -> frozenset[str]:
+    """Return ``table_name`` plus every table its writes cascade into via FKs."""
+    tables = {table_name}
+    pending = [table_name]
+    while pending:
+        current = pending.pop()
+        for table in models.Base.metadata.tables.values():
+            if table.name not in tables and any(
+                key.column.table.name == current for key in table.foreign_keys
+            ):
+                tables.add(table.name)
+                pending.append(table.name)
+    return frozenset(tables)
+
+
+def _invalidate_reads(table_name: str) -> None:
+    """Drop cached reads of a table after a committed write."""
+    read_cache.invalidate(_dependent_tables(table_name))
+
+
+def _fetch_rows(
+    session: Session, stmt: Select, params: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
+    """Execute a column-level select and return plain dict rows."""
+    return [dict(row) for row in session.execute(stmt, params).mappings()]
+
+
+def _rows_response(config: TableView, rows: list[dict[str, Any]]) -> Response:
+    """Validate and serialize rows once with the table's precompiled adapter."""
+    adapter = config.list_adapter
+    return Response(
+        adapter.dump_json(adapter.validate_python(rows)),
+        media_type="application/json",
+    )
+
+
+def _item_response(config: TableView, row: dict[str, Any]) -> Response:
+    return Response(
+        config.read_schema.model_validate(row).model_dump_json(),
+        media_type="application/json",
+    )
+
+
+def _page_size(limit: int | None) -> int:
+    """Clamp the requested page size to the server-side maximum."""
+    if limit is None:
+        limit = settings.default_page_size
+    return max(1, min(limit, settings.max_page_size))
+
+
+def _set_next_page_headers(
+    request: Request,
+    response: Response,
+    cursor: int | str,
+    page_size: int,
+    param: str = "after_id",
+) -> None:
+    """Advertise the keyset cursor of the next page via Link/X-Next-Cursor.
+
+    Default (id) ordering pages with ``after_id``; custom sorts use an opaque
+    ``cursor`` token.
+    """
+    next_url = request.url.include_query_params(**{param: cursor, "limit": page_size})
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = str(cursor)
+
+
+def _table_versions(session: Session, table_names: Sequence[str]) -> dict[str, str]:
+    """Return the current version of each of ``table_names``.
+
+    Ticket writes are counted per program (``agency.ticket_sales``) rather
+    than on the shared ``ticket`` row, so the ticket version combines both.
+    """
+    versions = {
+        name: str(version)
+        for name, version in session.execute(
+            select(models.TableVersion.table_name, models.TableVersion.version).where(
+                models.TableVersion.table_name.in_(table_names)
+            )
+        )
+    }
+    if models.Ticket.__tablename__ in table_names:
+        per_program = session.scalar(
+            select(func.coalesce(func.sum(models.TicketSales.version), 0))
+        )
+        shared = versions.get(models.Ticket.__tablename__, "0")
+        versions[models.Ticket.__tablename__] = f"{shared}.{per_program}"
+    return versions
+
+
+def _table_etag(session: Session, table_name: str) -> str:
+    """Return an ETag for the current version of ``table_name``.
+
+    Read before the rows so a concurrent write can only make the ETag stale,
+    never ahead.
+    """
+    version = _table_versions(session, (table_name,)).get(table_name, "0")
+    return f'"{table_name}-{version}"'
+
+
+def _tables_etag(session: Session, label: str, table_names: Sequence[str]) -> str:
+    """Return an ETag combining the versions of every table a read spans."""
+    versions = _table_versions(session, table_names)
+    return '"{}-{}"'.format(
+        label, ".".join(versions.get(name, "0") for name in table_names)
+    )
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _set_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    # Clients may keep the body but must revalidate it on every use.
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+
+def _stream_media_type(request: Request, stream: bool) -> str | None:
+    """Return the streaming media type requested by the client, if any."""
+    accept = request.headers.get("accept", "")
+    if CSV_MEDIA_TYPE in accept:
+        return CSV_MEDIA_TYPE
+    if NDJSON_MEDIA_TYPE in accept or stream:
+        return NDJSON_MEDIA_TYPE
+    return None
+
+
+def _partition_encoder(
+    config: TableView, media_type: str
+) -> tuple[str, Callable[[Sequence[Mapping[str, Any]]], str]]:
+    """Return the stream preamble and a function encoding one batch of rows."""
+    read_schema = config.read_schema
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[column.key for column in config.columns])
+    if media_type == CSV_MEDIA_TYPE:
+        writer.writeheader()
+    preamble = buffer.getvalue()
+
+    def encode(partition: Sequence[Mapping[str, Any]]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        if media_type == CSV_MEDIA_TYPE:
+            writer.writerows(partition)
+        else:
+            for row in partition:
+                buffer.write(read_schema.model_validate(row).model_dump_json())
+                buffer.write("\n")
+        return buffer.getvalue()
+
+    return preamble, encode
+
+
+def _stream_rows(
+    stmt: Select,
+    config: TableView,
+    media_type: str,
+    params: dict[str, Any] | None = None,
+) -> StreamingResponse:
+    """Stream query results batch by batch using a server-side cursor.
+
+    The generator owns its session so the cursor stays open for as long as the
+    response body is being sent, independently of request dependencies.
+    """
+    preamble, encode = _partition_encoder(config, media_type)
+    stmt = stmt.execution_options(yield_per=settings.stream_batch_size)
+
+    def generate() -> Iterator[str]:
+        session: Session = SessionLocal(bind=get_engine())
+        try:
+            if preamble:
+                yield preamble
+            for partition in session.execute(stmt, params).mappings().partitions():
+                yield encode(partition)
+        finally:
+            session.close()
+
+    async def generate_async() -> AsyncIterator[str]:
+        async with AsyncSessionLocal(bind=get_async_engine()) as session:
+            if preamble:
+                yield preamble
+            result = await session.stream(stmt, params)
+            async for partition in result.mappings().partitions():
+                yield encode(partition)
+
+    body = generate_async() if settings.db_async else generate()
+    return StreamingResponse(body, media_type=media_type)
 
 
-def _store_last_query(records: list[Any], to_schema: type[schemas.BaseModel]) -> None:
-    """Cache the last query result for CSV export."""
-    serialized = [to_schema.model_validate(record).model_dump() for record in records]
-    last_query_result["rows"] = serialized
-    last_query_result["columns"] = list(serialized[0].keys()) if serialized else []
+# Raw psycopg errors surface from COPY, which bypasses SQLAlchemy's wrapping.
+DB_ERRORS = (SQLAlchemyError, psycopg.Error)
 
 
-def _handle_db_error(session: Session, exc: SQLAlchemyError) -> None:
+def _db_error_message(exc: Exception) -> str:
+    return str(getattr(exc, "orig", exc))
+
+
+def _handle_db_error(session: Session, exc: Exception) -> None:
     session.rollback()
-    message = str(getattr(exc, "orig", exc))
-    raise HTTPException(status_code=400, detail=message)
+    raise HTTPException(status_code=400, detail=_db_error_message(exc))
+
+
+def _check_bulk_size(rows: list[Any]) -> None:
+    if len(rows) > settings.bulk_max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_rows} rows per bulk request",
+        )
+
+
+def _validate_bulk_rows(
+    rows: list[dict[str, Any]], schema: type[BaseModel]
+) -> tuple[list[tuple[int, dict[str, Any]]], list[schemas.BulkRowError]]:
+    """Validate each row independently, collecting per-row errors."""
+    valid: list[tuple[int, dict[str, Any]]] = []
+    errors: list[schemas.BulkRowError] = []
+    for index, row in enumerate(rows):
+        try:
+            values = schema.model_validate(row).model_dump()
+        except ValidationError as exc:
+            errors.append(
+                schemas.BulkRowError(index=index, detail=exc.errors(include_url=False))
+            )
+            continue
+        valid.append((index, values))
+    return valid, errors
+
+
+def _run_bulk(
+    session: Session,
+    run: Callable[[list[dict[str, Any]]], list[int]],
+    rows: list[tuple[int, dict[str, Any]]],
+) -> tuple[list[int], list[schemas.BulkRowError]]:
+    """Apply ``run`` to every row in one statement, committing once.
+
+    If the batch is rejected by the database, it is replayed row by row inside
+    savepoints so that the failure can be attributed to the offending rows
+    while every other row is still applied.
+    """
+    if not rows:
+        return [], []
+    try:
+        ids = run([values for _, values in rows])
+        session.commit()
+        return ids, []
+    except SQLAlchemyError:
+        session.rollback()
+    ids: list[int] = []
+    errors: list[schemas.BulkRowError] = []
+    for index, values in rows:
+        savepoint = session.begin_nested()
+        try:
+            ids.extend(run([values]))
+            savepoint.commit()
+        except SQLAlchemyError as exc:
+            savepoint.rollback()
+            errors.append(schemas.BulkRowError(index=index, detail=_db_error_message(exc)))
+    session.commit()
+    return ids, errors
+
+
+def _import_upload(
+    session: Session, config: TableConfig, upload: Any, ndjson: bool
+) -> schemas.ImportReport:
+    try:
+        report = import_records(
+            session,
+            config.model.__table__,
+            config.create_schema,
+            iter_records(upload, ndjson),
+            settings.import_max_rejected,
+        )
+        session.commit()
+        _invalidate_reads(config.model.__tablename__)
+    except DB_ERRORS as exc:
+        _handle_db_error(session, exc)
+    return report
+
+
+def _bulk_result(
+    ids: list[int], errors: list[schemas.BulkRowError]
+) -> schemas.BulkResult:
+    errors.sort(key=lambda error: error.index)
+    return schemas.BulkResult(
+        succeeded=len(ids), failed=len(errors), ids=ids, errors=errors
+    )
 
 
 def _ensure_entity(session: Session, model: type[models.Base], pk: Any) -> models.Base:
@@ -92,7 +586,42 @@ def _ensure_entity(session: Session, model: type[models.Base], pk: Any) -> model
     return instance
 
 
-def register_crud_routes(name: str, config: TableConfig) -> None:
+def _session_endpoint(handler: Callable[..., Any]) -> Callable[..., Any]:
+    """Serve ``handler`` from the event loop when DB_ASYNC is enabled.
+
+    Handlers are written once against a sync ``session``. In async mode the
+    route receives an ``AsyncSession`` instead and runs the handler through
+    ``AsyncSession.run_sync``, so database I/O awaits the async driver rather
+    than blocking a threadpool worker.
+    """
+    if not settings.db_async:
+        return handler
+    signature = inspect.signature(handler)
+    parameters = [
+        parameter.replace(
+            annotation=AsyncSession, default=Depends(get_async_session)
+        )
+        if name == "session"
+        else parameter
+        for name, parameter in signature.parameters.items()
+    ]
+
+    async def endpoint(**kwargs: Any) -> Any:
+        session: AsyncSession = kwargs.pop("session")
+
+        def call(sync_session: Session) -> Any:
+            return handler(session=sync_session, **kwargs)
+
+        return await session.run_sync(call)
+
+    endpoint.__name__ = handler.__name__
+    endpoint.__qualname__ = handler.__qualname__
+    endpoint.__doc__ = handler.__doc__
+    endpoint.__signature__ = signature.replace(parameters=parameters)
+    return endpoint
+
+
+def register_crud_routes(router: APIRouter, name: str, config: TableConfig) -> None:
     list_path = f"/api/{name}"
     item_path = f"/api/{name}/{{item_id}}"
 
@@ -100,24 +629,193 @@ def register_crud_routes(name: str, config: TableConfig) -> None:
     create_schema = config.create_schema
     update_schema = config.update_schema
     read_schema = config.read_schema
+    bulk_update_schema = create_model(
+        f"{update_schema.__name__}Bulk", __base__=update_schema, id=(int, ...)
+    )
 
-    @app.get(list_path, response_model=list[read_schema])
-    def list_items(session: Session = Depends(get_session)):
-        records = session.scalars(select(model)).all()
-        _store_last_query(records, read_schema)
-        return [read_schema.model_validate(record) for record in records]
+    @router.get(list_path, response_model=list[read_schema])
+    @_session_endpoint
+    def list_items(
+        request: Request,
+        limit: int | None = Query(None, ge=1, description="Maximum rows per page"),
+        after_id: int | None = Query(
+            None, description="Keyset cursor: return rows with id greater than this"
+        ),
+        stream: bool = Query(
+            False, description="Stream every row as NDJSON (or CSV via Accept)"
+        ),
+        cursor: str | None = Query(
+            None, description="Keyset cursor of a sorted list (from X-Next-Cursor)"
+        ),
+        sort: str | None = Query(None, description=SORT_DESCRIPTION),
+        fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+        session: Session = Depends(get_session),
+    ):
+        """List rows, filtered by ``column[__operator]=value`` parameters.
 
-    @app.get(item_path, response_model=read_schema)
-    def get_item(item_id: int, session: Session = Depends(get_session)):
-        instance = session.get(model, item_id)
-        if not instance:
+        Operators: eq (default), ne, gt, gte, lt, lte, in, between, isnull,
+        contains and startswith (text columns).
+        """
+        media_type = _stream_media_type(request, stream)
+        table = model.__table__
+        try:
+            list_query = parse_list_query(table, request.query_params.multi_items(), sort)
+            position: list[Any] | None = None
+            if cursor is not None:
+                position = decode_cursor(table, list_query.sort, cursor)
+            elif after_id is not None:
+                if list_query.custom_sort:
+                    raise QueryError("Use cursor instead of after_id with sort")
+                position = [after_id]
+        except QueryError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        view = _table_view(config, fields, required=list_query.sort_columns)
+        stmt = compile_list_query(
+            table,
+            tuple(column.key for column in view.columns),
+            list_query.filters,
+            list_query.sort,
+            None if position is None else tuple(value is None for value in position),
+        )
+        params = list_query.params(position)
+        if media_type is not None:
+            return _stream_rows(stmt, view, media_type, params)
+        cache_key = _read_cache_key("list", request)
+        generation = read_cache.generation(model.__tablename__)
+        cached = read_cache.get(model.__tablename__, cache_key)
+        if cached is not None:
+            return _replay_cached_read(request, view, cached)
+        etag = _table_etag(session, model.__tablename__)
+        if _etag_matches(request, etag):
+            return _set_etag(Response(status_code=304), etag)
+        page_size = _page_size(limit)
+        rows = _fetch_rows(session, stmt.limit(page_size + 1), params)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        response = _set_etag(_rows_response(view, rows), etag)
+        if has_more and list_query.custom_sort:
+            next_cursor = encode_cursor(rows[-1], list_query.sort)
+            _set_next_page_headers(request, response, next_cursor, page_size, "cursor")
+        elif has_more:
+            _set_next_page_headers(request, response, rows[-1]["id"], page_size)
+        _cache_read(model.__tablename__, cache_key, response, rows, generation)
+        _store_last_query(request, response, view, rows)
+        return response
+
+    # Bulk routes are registered before the item routes so that "bulk" is not
+    # captured by the {item_id} path parameter.
+    @router.post(f"{list_path}/bulk", response_model=schemas.BulkResult)
+    @_session_endpoint
+    def bulk_create_items(
+        rows: list[dict[str, Any]] = Body(...),
+        session: Session = Depends(get_session),
+    ):
+        _check_bulk_size(rows)
+        valid, errors = _validate_bulk_rows(rows, create_schema)
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        ids, db_errors = _run_bulk(
+            session, lambda batch: list(session.scalars(stmt, batch)), valid
+        )
+        _invalidate_reads(model.__tablename__)
+        return _bulk_result(ids, errors + db_errors)
+
+    @router.put(f"{list_path}/bulk", response_model=schemas.BulkResult)
+    @_session_endpoint
+    def bulk_update_items(
+        rows: list[dict[str, Any]] = Body(...),
+        session: Session = Depends(get_session),
+    ):
+        _check_bulk_size(rows)
+        valid, errors = _validate_bulk_rows(rows, bulk_update_schema)
+        requested = [values["id"] for _, values in valid]
+        existing = set(session.scalars(select(model.id).where(model.id.in_(requested))))
+        found: list[tuple[int, dict[str, Any]]] = []
+        for index, values in valid:
+            if values["id"] in existing:
+                found.append((index, values))
+            else:
+                errors.append(
+                    schemas.BulkRowError(
+                        index=index,
+                        detail=f"{model.__name__} with id={values['id']} not found",
+                    )
+                )
+
+        def run(batch: list[dict[str, Any]]) -> list[int]:
+            session.execute(update(model), batch)
+            return [values["id"] for values in batch]
+
+        ids, db_errors = _run_bulk(session, run, found)
+        _invalidate_reads(model.__tablename__)
+        return _bulk_result(ids, errors + db_errors)
+
+    @router.delete(f"{list_path}/bulk", response_model=schemas.BulkResult)
+    @_session_endpoint
+    def bulk_delete_items(
+        ids: list[int] = Body(...),
+        session: Session = Depends(get_session),
+    ):
+        _check_bulk_size(ids)
+        try:
+            deleted = set(
+                session.scalars(
+                    delete(model).where(model.id.in_(ids)).returning(model.id)
+                )
+            )
+            session.commit()
+        except SQLAlchemyError as exc:
+            _handle_db_error(session, exc)
+        _invalidate_reads(model.__tablename__)
+        errors = [
+            schemas.BulkRowError(
+                index=index, detail=f"{model.__name__} with id={item_id} not found"
+            )
+            for index, item_id in enumerate(ids)
+            if item_id not in deleted
+        ]
+        return _bulk_result(sorted(deleted), errors)
+
+    @router.post(f"{list_path}/import", response_model=schemas.ImportReport)
+    async def import_items(request: Request, session: Session = Depends(get_session)):
+        """Load a CSV (text/csv) or NDJSON (application/x-ndjson) request body."""
+        ndjson = NDJSON_MEDIA_TYPE in request.headers.get("content-type", "")
+        # The body is spooled (to disk past IMPORT_SPOOL_SIZE) so the COPY can run
+        # in a worker thread without holding the whole upload in memory.
+        with tempfile.SpooledTemporaryFile(max_size=settings.import_spool_size) as upload:
+            async for chunk in request.stream():
+                upload.write(chunk)
+            upload.seek(0)
+            return await run_in_threadpool(_import_upload, session, config, upload, ndjson)
+
+    @router.get(item_path, response_model=read_schema)
+    @_session_endpoint
+    def get_item(
+        item_id: int,
+        request: Request,
+        fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+        session: Session = Depends(get_session),
+    ):
+        view = _table_view(config, fields)
+        cache_key = _read_cache_key("item", request, item_id)
+        generation = read_cache.generation(model.__tablename__)
+        cached = read_cache.get(model.__tablename__, cache_key)
+        if cached is not None:
+            return _replay_cached_read(request, view, cached)
+        etag = _table_etag(session, model.__tablename__)
+        if _etag_matches(request, etag):
+            return _set_etag(Response(status_code=304), etag)
+        rows = _fetch_rows(session, select(*view.columns).where(model.id == item_id))
+        if not rows:
             raise HTTPException(
                 status_code=404, detail=f"{model.__name__} with id={item_id} not found"
             )
-        _store_last_query([instance], read_schema)
-        return read_schema.model_validate(instance)
+        response = _set_etag(_item_response(view, rows[0]), etag)
+        _cache_read(model.__tablename__, cache_key, response, rows, generation)
+        _store_last_query(request, response, view, rows)
+        return response
 
-    @app.post(list_path, response_model=read_schema, status_code=201)
+    @router.post(list_path, response_model=read_schema, status_code=201)
+    @_session_endpoint
     def create_item(payload: create_schema, session: Session = Depends(get_session)):
         instance = model(**payload.model_dump())
         session.add(instance)
@@ -125,10 +823,12 @@ def register_crud_routes(name: str, config: TableConfig) -> None:
             session.commit()
         except SQLAlchemyError as exc:
             _handle_db_error(session, exc)
+        _invalidate_reads(model.__tablename__)
         session.refresh(instance)
         return read_schema.model_validate(instance)
 
-    @app.put(item_path, response_model=read_schema)
+    @router.put(item_path, response_model=read_schema)
+    @_session_endpoint
     def update_item(
         item_id: int, payload: update_schema, session: Session = Depends(get_session)
     ):
@@ -143,10 +843,12 @@ def register_crud_routes(name: str, config: TableConfig) -> None:
             session.commit()
         except SQLAlchemyError as exc:
             _handle_db_error(session, exc)
+        _invalidate_reads(model.__tablename__)
         session.refresh(instance)
         return read_schema.model_validate(instance)
 
-    @app.delete(item_path, status_code=204)
+    @router.delete(item_path, status_code=204)
+    @_session_endpoint
     def delete_item(item_id: int, session: Session = Depends(get_session)):
         instance = session.get(model, item_id)
         if not instance:
@@ -155,16 +857,164 @@ def register_crud_routes(name: str, config: TableConfig) -> None:
             )
         session.delete(instance)
         session.commit()
+        _invalidate_reads(model.__tablename__)
+
+
+# Every table a nested concert program document is built from.
+PROGRAM_GRAPH_TABLES = (
+    "concert_program",
+    "venue",
+    "organizer_concert_program",
+    "organizer",
+    "performance_concert_program",
+    "performance",
+    "artist_performance",
+    "artist",
+)
+# One query for the programs (venue joined in), then one IN query per
+# collection level, however many programs the page holds.
+PROGRAM_GRAPH_OPTIONS = (
+    joinedload(models.ConcertProgram.venue),
+    selectinload(models.ConcertProgram.organizers),
+    selectinload(models.ConcertProgram.performances).selectinload(
+        models.Performance.artists
+    ),
+)
+program_full_adapter = TypeAdapter(list[schemas.ConcertProgramFull])
+
+
+def _program_graph_response(programs: Sequence[models.ConcertProgram]) -> Response:
+    return Response(
+        program_full_adapter.dump_json(
+            program_full_adapter.validate_python(programs, from_attributes=True)
+        ),
+        media_type="application/json",
+    )
+
+
+def register_program_routes(router: APIRouter) -> None:
+    """Register the nested concert program reads.
+
+    Called before the CRUD routes so that "full" is not captured by the
+    ``{item_id}`` path parameter.
+    """
+
+    @router.get(
+        "/api/concert_program/full", response_model=list[schemas.ConcertProgramFull]
+    )
+    @_session_endpoint
+    def list_programs_full(
+        request: Request,
+        limit: int | None = Query(None, ge=1, description="Maximum programs per page"),
+        after_id: int | None = Query(
+            None, description="Keyset cursor: return programs with id greater than this"
+        ),
+        session: Session = Depends(get_session),
+    ):
+        """List concert programs with their venue, organizers, performances
+        and each performance's artists."""
+        etag = _tables_etag(session, "concert_program-full", PROGRAM_GRAPH_TABLES)
+        if _etag_matches(request, etag):
+            return _set_etag(Response(status_code=304), etag)
+        page_size = _page_size(limit)
+        stmt = (
+            select(models.ConcertProgram)
+            .options(*PROGRAM_GRAPH_OPTIONS)
+            .order_by(models.ConcertProgram.id)
+            .limit(page_size + 1)
+        )
+        if after_id is not None:
+            stmt = stmt.where(models.ConcertProgram.id > after_id)
+        programs = session.scalars(stmt).all()
+        has_more = len(programs) > page_size
+        programs = programs[:page_size]
+        response = _set_etag(_program_graph_response(programs), etag)
+        if has_more:
+            _set_next_page_headers(request, response, programs[-1].id, page_size)
+        return response
+
+    @router.get(
+        "/api/concert_program/{item_id}/full", response_model=schemas.ConcertProgramFull
+    )
+    @_session_endpoint
+    def get_program_full(
+        item_id: int, request: Request, session: Session = Depends(get_session)
+    ):
+        etag = _tables_etag(session, f"concert_program-{item_id}-full", PROGRAM_GRAPH_TABLES)
+        if _etag_matches(request, etag):
+            return _set_etag(Response(status_code=304), etag)
+        program = session.scalar(
+            select(models.ConcertProgram)
+            .options(*PROGRAM_GRAPH_OPTIONS)
+            .where(models.ConcertProgram.id == item_id)
+        )
+        if program is None:
+            raise HTTPException(
+                status_code=404, detail=f"ConcertProgram with id={item_id} not found"
+            )
+        document = schemas.ConcertProgramFull.model_validate(program)
+        return _set_etag(
+            Response(document.model_dump_json(), media_type="application/json"), etag
+        )
+
+
+def _run_relation_bulk(
+    session: Session,
+    relation: Relation,
+    pair_schema: type[BaseModel],
+    rows: list[dict[str, Any]],
+    apply: Callable[..., schemas.RelationBulkResult],
+) -> schemas.RelationBulkResult:
+    _check_bulk_size(rows)
+    valid, errors = _validate_bulk_rows(rows, pair_schema)
+    pairs = [
+        (index, values[relation.left_column], values[relation.right_column])
+        for index, values in valid
+    ]
+    try:
+        result = apply(session, relation, pairs)
+        session.commit()
+    except SQLAlchemyError as exc:
+        _handle_db_error(session, exc)
+    _invalidate_reads(relation.model.__tablename__)
+    result.errors = sorted(errors + result.errors, key=lambda error: error.index)
+    return result
 
 
-for table_name, configuration in TABLE_CONFIGS.items():
-    register_crud_routes(table_name, configuration)
+def register_relation_routes(router: APIRouter, name: str, relation: Relation) -> None:
+    """Register bulk link (POST) and unlink (DELETE) routes for a link table.
 
+    Both take a list of ``{left_column: id, right_column: id}`` objects and
+    apply the whole batch in one statement.
+    """
+    path = f"/api/{name}/bulk"
+    pair_schema = create_model(
+        f"{relation.model.__name__}Pair",
+        **{relation.left_column: (int, ...), relation.right_column: (int, ...)},
+    )
+
+    @router.post(path, response_model=schemas.RelationBulkResult)
+    @_session_endpoint
+    def bulk_link(
+        pairs: list[dict[str, Any]] = Body(...),
+        session: Session = Depends(get_session),
+    ):
+        return _run_relation_bulk(session, relation, pair_schema, pairs, link_pairs)
 
-@app.post(
+    @router.delete(path, response_model=schemas.RelationBulkResult)
+    @_session_endpoint
+    def bulk_unlink(
+        pairs: list[dict[str, Any]] = Body(...),
+        session: Session = Depends(get_session),
+    ):
+        return _run_relation_bulk(session, relation, pair_schema, pairs, unlink_pairs)
+
+
+@router.post(
     "/api/artist/{artist_id}/performance/{performance_id}/add",
     response_model=schemas.OperationStatus,
 )
+@_session_endpoint
 def add_artist_performance(
     artist_id: int, performance_id: int, session: Session = Depends(get_session)
 ):
@@ -178,13 +1028,15 @@ def add_artist_performance(
     )
     session.add(relation)
     session.commit()
+    _invalidate_reads(relation.__tablename__)
     return schemas.OperationStatus(message="Artist linked to performance")
 
 
-@app.post(
+@router.post(
     "/api/artist/{artist_id}/performance/{performance_id}/remove",
     response_model=schemas.OperationStatus,
 )
+@_session_endpoint
 def remove_artist_performance(
     artist_id: int, performance_id: int, session: Session = Depends(get_session)
 ):
@@ -193,13 +1045,15 @@ def remove_artist_performance(
         raise HTTPException(status_code=404, detail="Relation not found")
     session.delete(relation)
     session.commit()
+    _invalidate_reads(relation.__tablename__)
     return schemas.OperationStatus(message="Artist unlinked from performance")
 
 
-@app.post(
+@router.post(
     "/api/organizer/{organizer_id}/concert_program/{program_id}/add",
     response_model=schemas.OperationStatus,
 )
+@_session_endpoint
 def add_organizer_concert_program(
     organizer_id: int, program_id: int, session: Session = Depends(get_session)
 ):
@@ -213,13 +1067,15 @@ def add_organizer_concert_program(
     )
     session.add(relation)
     session.commit()
+    _invalidate_reads(relation.__tablename__)
     return schemas.OperationStatus(message="Organizer linked to concert program")
 
 
-@app.post(
+@router.post(
     "/api/organizer/{organizer_id}/concert_program/{program_id}/remove",
     response_model=schemas.OperationStatus,
 )
+@_session_endpoint
 def remove_organizer_concert_program(
     organizer_id: int, program_id: int, session: Session = Depends(get_session)
 ):
@@ -228,13 +1084,15 @@ def remove_organizer_concert_program(
         raise HTTPException(status_code=404, detail="Relation not found")
     session.delete(relation)
     session.commit()
+    _invalidate_reads(relation.__tablename__)
     return schemas.OperationStatus(message="Organizer unlinked from concert program")
 
 
-@app.post(
+@router.post(
     "/api/performance/{performance_id}/concert_program/{program_id}/add",
     response_model=schemas.OperationStatus,
 )
+@_session_endpoint
 def add_performance_concert_program(
     performance_id: int, program_id: int, session: Session = Depends(get_session)
 ):
@@ -251,13 +1109,15 @@ def add_performance_concert_program(
     )
     session.add(relation)
     session.commit()
+    _invalidate_reads(relation.__tablename__)
     return schemas.OperationStatus(message="Performance linked to concert program")
 
 
-@app.post(
+@router.post(
     "/api/performance/{performance_id}/concert_program/{program_id}/remove",
     response_model=schemas.OperationStatus,
 )
+@_session_endpoint
 def remove_performance_concert_program(
     performance_id: int, program_id: int, session: Session = Depends(get_session)
 ):
@@ -268,65 +1128,531 @@ def remove_performance_concert_program(
         raise HTTPException(status_code=404, detail="Relation not found")
     session.delete(relation)
     session.commit()
+    _invalidate_reads(relation.__tablename__)
     return schemas.OperationStatus(message="Performance unlinked from concert program")
 
 
-@app.post("/api/db/query")
-def execute_sql_query(
-    payload: schemas.SQLQuery, session: Session = Depends(get_session)
+@router.post(
+    "/api/ticket/issue", response_model=schemas.TicketIssueResult, status_code=201
+)
+@_session_endpoint
+def issue_program_tickets(
+    payload: schemas.TicketIssueRequest, session: Session = Depends(get_session)
 ):
-    result = session.execute(text(payload.query))
-    if result.returns_rows:
-        rows = result.mappings().all()
-        data = [dict(row) for row in rows]
-        last_query_result["rows"] = data
-        last_query_result["columns"] = list(rows[0].keys()) if rows else []
-        return {"rows": data}
-    session.commit()
-    last_query_result["rows"] = []
-    last_query_result["columns"] = []
-    return {"rowcount": result.rowcount}
+    """Sell several tickets for one concert program in a single transaction.
 
+    Responds 409 when the venue's capacity would be exceeded or a seat is
+    already sold; nothing is issued in that case.
+    """
+    if payload.quantity > settings.bulk_max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_rows} tickets per request",
+        )
+    try:
+        rows, remaining = issue_tickets(
+            session,
+            payload.concert_program_id,
+            payload.quantity,
+            payload.price,
+            client_id=payload.client_id,
+            places=payload.places,
+        )
+        session.commit()
+    except IntegrityError as exc:
+        session.rollback()
+        diag = getattr(exc.orig, "diag", None)
+        constraint = getattr(diag, "constraint_name", None)
+        if constraint == CAPACITY_CONSTRAINT:
+            raise HTTPException(status_code=409, detail=diag.message_primary) from exc
+        if constraint == SEAT_INDEX:
+            raise HTTPException(
+                status_code=409, detail="One of the requested places is already sold"
+            ) from exc
+        _handle_db_error(session, exc)
+    except SQLAlchemyError as exc:
+        _handle_db_error(session, exc)
+    if not rows:
+        raise HTTPException(
+            status_code=404,
+            detail=f"ConcertProgram with id={payload.concert_program_id} not found",
+        )
+    _invalidate_reads(models.Ticket.__tablename__)
+    return schemas.TicketIssueResult(
+        concert_program_id=payload.concert_program_id,
+        tickets=rows,
+        remaining=remaining,
+    )
 
-@app.get("/api/db/filter/{table_name}")
-def filter_table(
-    table_name: str,
-    column: str = Query(..., description="Column name to filter by"),
-    query: str = Query(..., description="Substring to search for"),
+
+# Ad-hoc queries run under application_name "agency-query:<query_id>" so
+# that any worker can find and cancel them through pg_stat_activity.
+QUERY_APPLICATION_PREFIX = "agency-query:"
+# Single SELECT-like statements can be read through a server-side cursor;
+# anything else (several statements, DML, SHOW, EXPLAIN) is fetched whole.
+STREAMABLE_QUERY = re.compile(
+    r"^\s*(select|with|values|table)\b[^;]*;?\s*$", re.IGNORECASE
+)
+
+
+def _guard_sql_transaction(
+    session: Session | Connection,
+    payload: schemas.SQLQuery,
+    query_id: str,
+    idle_timeout: float = 0,
+) -> None:
+    """Open the transaction of an ad-hoc query with its limits applied.
+
+    The settings are transaction-local, so they never leak into the pool.
+    Read-only mode guards against accidental writes; it is not a permission
+    boundary (the SQL can still end the transaction itself). A non-zero
+    ``idle_timeout`` lets the server end a transaction left open between
+    cursor fetches should this process stop closing it.
+    """
+    if not payload.allow_writes:
+        session.execute(text("SET TRANSACTION READ ONLY"))
+    timeout = min(
+        payload.timeout or settings.sql_query_timeout, settings.sql_query_timeout
+    )
+    session.execute(
+        text(
+            "SELECT set_config('statement_timeout', :timeout, true), "
+            "set_config('idle_in_transaction_session_timeout', :idle_timeout, true), "
+            "set_config('application_name', :name, true)"
+        ),
+        {
+            "timeout": str(max(1, round(timeout * 1000))),
+            "idle_timeout": str(round(idle_timeout * 1000)),
+            "name": f"{QUERY_APPLICATION_PREFIX}{query_id}",
+        },
+    )
+
+
+def _sql_query_error(exc: SQLAlchemyError) -> HTTPException:
+    """408 for queries stopped by their timeout or a cancel, 400 otherwise."""
+    canceled = isinstance(getattr(exc, "orig", None), psycopg.errors.QueryCanceled)
+    return HTTPException(
+        status_code=408 if canceled else 400, detail=_db_error_message(exc)
+    )
+
+
+def _sql_max_rows(requested: int | None) -> int:
+    return min(requested or settings.sql_query_max_rows, settings.sql_query_max_rows)
+
+
+@router.post("/api/db/query")
+@_session_endpoint
+def execute_sql_query(
+    payload: schemas.SQLQuery,
+    request: Request,
     session: Session = Depends(get_session),
 ):
+    """Run ad-hoc SQL with a statement timeout and a cap on returned rows.
+
+    The transaction is read-only unless ``allow_writes`` is set. Results
+    longer than ``max_rows`` are cut short and flagged ``truncated``.
+    """
+    query_id = payload.query_id or uuid.uuid4().hex
+    max_rows = _sql_max_rows(payload.max_rows)
+    stream = not payload.allow_writes and bool(STREAMABLE_QUERY.match(payload.query))
+    data: list[dict[str, Any]] | None = None
+    try:
+        _guard_sql_transaction(session, payload, query_id)
+        result = session.execute(
+            text(payload.query), execution_options={"stream_results": stream}
+        )
+        if result.returns_rows:
+            columns = list(result.keys())
+            data = [dict(row) for row in result.mappings().fetchmany(max_rows + 1)]
+            result.close()
+        if payload.allow_writes:
+            session.commit()
+    except SQLAlchemyError as exc:
+        session.rollback()
+        raise _sql_query_error(exc) from exc
+    if payload.allow_writes:
+        # Raw SQL may have written to any table.
+        read_cache.clear()
+        result_store.clear_latest(_client_key(request))
+    if data is None:
+        return {"rowcount": result.rowcount, "query_id": query_id}
+    truncated = len(data) > max_rows
+    del data[max_rows:]
+    handle = _remember_result(request, columns, data)
+    return {
+        "rows": data,
+        "handle": handle,
+        "truncated": truncated,
+        "query_id": query_id,
+    }
+
+
+@router.post("/api/db/query/{query_id}/cancel", response_model=schemas.OperationStatus)
+@_session_endpoint
+def cancel_sql_query(query_id: str, session: Session = Depends(get_session)):
+    """Cancel a running ad-hoc query with ``pg_cancel_backend``."""
+    cancelled = session.scalars(
+        text(
+            "SELECT pg_cancel_backend(pid) FROM pg_stat_activity "
+            "WHERE application_name = :name AND state = 'active'"
+        ),
+        {"name": f"{QUERY_APPLICATION_PREFIX}{query_id}"},
+    ).all()
+    if not any(cancelled):
+        raise HTTPException(status_code=404, detail=f"No running query {query_id!r}")
+    return schemas.OperationStatus(message=f"Query {query_id} cancelled")
+
+
+def _missing_cursor(cursor_id: str) -> HTTPException:
+    if not query_cursors.owns(cursor_id) and cursor_owner(cursor_id) is not None:
+        # Cursors live in the worker that opened them; see app.query_cursors.
+        return HTTPException(
+            status_code=421,
+            detail=f"Query cursor {cursor_id!r} belongs to another worker process; "
+            "its requests must be routed to that worker (sticky sessions)",
+        )
+    return HTTPException(
+        status_code=404, detail=f"Query cursor {cursor_id!r} is closed or expired"
+    )
+
+
+# Cursor routes hold a sync connection between requests, so they run in the
+# threadpool in both modes rather than through _session_endpoint.
+@router.post("/api/db/query/cursor")
+def open_sql_cursor(payload: schemas.SQLQuery, request: Request):
+    """Run a read-only query and return its first ``max_rows`` rows.
+
+    When more rows remain, a single SELECT stays open as a server-side cursor
+    whose ``cursor_id`` pages through the rest. Other statements are read
+    like ``/api/db/query`` and flagged ``truncated`` instead. A result that
+    fits in the first page is stored for the CSV export like
+    ``/api/db/query`` does, and its ``handle`` returned.
+    """
+    if payload.allow_writes:
+        raise HTTPException(status_code=400, detail="Query cursors are read-only")
+    if not query_cursors.has_room():
+        raise HTTPException(
+            status_code=503, detail="Too many open query cursors; close one first"
+        )
+    query_id = payload.query_id or uuid.uuid4().hex
+    keep = bool(STREAMABLE_QUERY.match(payload.query))
+    connection = get_engine().connect()
+    try:
+        _guard_sql_transaction(
+            connection, payload, query_id, idle_timeout=2 * query_cursors.idle_timeout
+        )
+        result = connection.execute(
+            text(payload.query), execution_options={"stream_results": keep}
+        )
+    except SQLAlchemyError as exc:
+        connection.close()
+        raise _sql_query_error(exc) from exc
+    if not result.returns_rows:
+        connection.close()
+        return {"rowcount": result.rowcount, "query_id": query_id}
+    columns = list(result.keys())
+    try:
+        rows, cursor_id, more = query_cursors.open(
+            connection, result, _sql_max_rows(payload.max_rows), keep=keep
+        )
+    except CursorLimitError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except SQLAlchemyError as exc:
+        raise _sql_query_error(exc) from exc
+    if more:
+        # Only the first page is known here, so the CSV export has nothing
+        # whole to save for this client.
+        result_store.clear_latest(_client_key(request))
+        handle = None
+    else:
+        handle = _remember_result(request, columns, rows)
+    return {
+        "rows": rows,
+        "handle": handle,
+        "cursor_id": cursor_id,
+        "truncated": more and cursor_id is None,
+        "query_id": query_id,
+    }
+
+
+@router.get("/api/db/query/cursor/{cursor_id}")
+def fetch_sql_cursor(
+    cursor_id: str,
+    limit: int | None = Query(None, ge=1, description="Rows to fetch"),
+):
+    """Fetch the next page of an open cursor; ``cursor_id`` is null at the end."""
+    try:
+        rows, more = query_cursors.fetch(cursor_id, _sql_max_rows(limit))
+    except KeyError as exc:
+        raise _missing_cursor(cursor_id) from exc
+    except SQLAlchemyError as exc:
+        raise _sql_query_error(exc) from exc
+    return {"rows": rows, "cursor_id": cursor_id if more else None}
+
+
+@router.delete("/api/db/query/cursor/{cursor_id}", status_code=204)
+def close_sql_cursor(cursor_id: str):
+    if not query_cursors.close(cursor_id):
+        raise _missing_cursor(cursor_id)
+    return Response(status_code=204)
+
+
+def _flush_results_periodically(stop: threading.Event) -> None:
+    """Write the clients' latest results where every worker can read them."""
+    while True:
+        stopping = stop.wait(settings.result_store_flush_interval)
+        try:
+            result_store.flush()
+        except OSError as exc:
+            logger.warning("Flushing the result store failed: %s", exc)
+        if stopping:
+            return
+
+
+def _expire_cursors_periodically(stop: threading.Event) -> None:
+    """Close idle query cursors even when no request comes to trigger it."""
+    while not stop.wait(max(1.0, query_cursors.idle_timeout / 2)):
+        query_cursors.expire()
+
+
+def _filter_condition(column: Any, query: str, prefix: bool) -> Any:
+    """Pick an index-friendly operator for the column's type.
+
+    Integer and date columns are compared for equality (btree-indexable), text
+    columns use ILIKE on the raw column so the trigram GIN indexes apply.
+    """
+    python_type = column.type.python_type
+    if python_type in (int, date):
+        try:
+            value = TypeAdapter(python_type).validate_python(query.strip())
+        except ValidationError as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid {python_type.__name__} value for {column.key!r}",
+            ) from exc
+        return column == value
+    return column.ilike(like_pattern(query, prefix), escape="\\")
+
+
+def _filtered_select(
+    table_name: str, column: str, query: str, prefix: bool = False
+) -> tuple[TableConfig, Select]:
+    """Build the column-level select shared by filtering and exports."""
     config = TABLE_CONFIGS.get(table_name)
     if not config:
         raise HTTPException(status_code=404, detail="Table not found")
-    column_attr = getattr(config.model, column, None)
-    if column_attr is None:
+    column_obj = config.model.__table__.columns.get(column)
+    if column_obj is None:
         raise HTTPException(status_code=400, detail="Unknown column for selected table")
-    stmt = select(config.model).where(cast(column_attr, String).ilike(f"%{query}%"))
-    records = session.scalars(stmt).all()
-    _store_last_query(records, config.read_schema)
-    return [config.read_schema.model_validate(record) for record in records]
+    condition = _filter_condition(column_obj, query, prefix)
+    return config, select(*config.columns).where(condition)
 
 
-@app.post("/api/db/csv", response_model=schemas.OperationStatus)
-def save_last_query_to_csv(payload: schemas.CSVRequest | None = None):
-    if not last_query_result["rows"]:
-        raise HTTPException(
-            status_code=400, detail="No query executed or result is empty"
-        )
-    filename = (
-        payload.filename if payload and payload.filename else "last_query.csv"
-    ).strip()
+def _export_select(table_name: str, column: str | None, query: str | None) -> Select:
+    if column is not None and query is not None:
+        config, stmt = _filtered_select(table_name, column, query)
+    else:
+        config = TABLE_CONFIGS.get(table_name)
+        if not config:
+            raise HTTPException(status_code=404, detail="Table not found")
+        stmt = select(*config.columns)
+    return stmt.order_by(config.model.id)
+
+
+def _csv_target(filename: str | None, default: str) -> Path:
+    """Resolve a CSV filename inside ``settings.csv_dir``."""
+    filename = (filename or default).strip()
     if not filename:
         raise HTTPException(status_code=400, detail="Filename cannot be empty")
     if not filename.endswith(".csv"):
         filename += ".csv"
     target_dir = settings.csv_dir
     target_dir.mkdir(parents=True, exist_ok=True)
-    target_path = target_dir / filename
+    return target_dir / filename
+
+
+@router.get("/api/db/filter/{table_name}")
+@_session_endpoint
+def filter_table(
+    table_name: str,
+    request: Request,
+    column: str = Query(..., description="Column name to filter by"),
+    query: str = Query(..., description="Value or substring to search for"),
+    prefix: bool = Query(False, description="Match text columns by prefix only"),
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+    limit: int | None = Query(None, ge=1, description="Page size"),
+    after_id: int | None = Query(None, description="Keyset cursor: last id seen"),
+    session: Session = Depends(get_session),
+):
+    """Return one keyset page of the rows matching ``query``, in id order.
+
+    A short ``query`` can match the whole table, so results are paged like
+    the list routes (``Link``/``X-Next-Cursor`` headers).
+    """
+    config, stmt = _filtered_select(table_name, column, query, prefix)
+    view = _table_view(config, fields)
+    if after_id is not None:
+        stmt = stmt.where(config.model.id > after_id)
+    page_size = _page_size(limit)
+    stmt = stmt.with_only_columns(*view.columns).order_by(config.model.id)
+    rows = _fetch_rows(session, stmt.limit(page_size + 1))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    response = _rows_response(view, rows)
+    if has_more:
+        _set_next_page_headers(request, response, rows[-1]["id"], page_size)
+    _store_last_query(request, response, view, rows)
+    return response
+
+
+@router.get("/api/search", response_model=list[schemas.SearchHit])
+@_session_endpoint
+def search(
+    q: str = Query(..., min_length=1, description="Words to search for (prefix match)"),
+    tables: str | None = Query(
+        None, description="Comma-separated tables to search; defaults to all"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session),
+):
+    selected = list(SEARCH_LABELS)
+    if tables:
+        selected = [name.strip() for name in tables.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in SEARCH_LABELS]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Tables not searchable: {', '.join(unknown)}"
+            )
+    tsquery = prefix_tsquery(q)
+    if tsquery is None or not selected:
+        return []
+    rows = session.execute(build_search(tsquery, selected, limit)).mappings()
+    return [schemas.SearchHit.model_validate(row) for row in rows]
+
+
+def _get_report(name: str) -> Report:
+    report = REPORTS.get(name)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Unknown report {name!r}")
+    return report
+
+
+@router.get("/api/reports", response_model=list[schemas.ReportInfo])
+@_session_endpoint
+def list_reports(session: Session = Depends(get_session)):
+    connection = session.connection()
+    return [
+        schemas.ReportInfo(
+            report=report.name,
+            description=report.description,
+            **report_freshness(connection, report),
+        )
+        for report in REPORTS.values()
+    ]
+
+
+@router.get("/api/reports/{name}", response_model=schemas.ReportData)
+@_session_endpoint
+def get_report(name: str, session: Session = Depends(get_session)):
+    """Return a report's precomputed rows and how old they are."""
+    report = _get_report(name)
+    connection = session.connection()
+    freshness = report_freshness(connection, report)
+    return schemas.ReportData(
+        report=report.name,
+        description=report.description,
+        rows=read_report(connection, report),
+        **freshness,
+    )
+
+
+@router.post("/api/reports/refresh", response_model=list[schemas.ReportRefreshResult])
+def refresh_reports(
+    name: str | None = Query(None, description="Report to refresh; defaults to all"),
+):
+    """Rebuild report views with REFRESH MATERIALIZED VIEW CONCURRENTLY."""
+    selected = [_get_report(name)] if name else list(REPORTS.values())
+    results = []
+    for report in selected:
+        try:
+            duration = refresh_report(get_engine(), report)
+        except SQLAlchemyError as exc:
+            raise HTTPException(status_code=400, detail=_db_error_message(exc)) from exc
+        results.append(
+            schemas.ReportRefreshResult(
+                report=report.name,
+                refreshed=duration is not None,
+                duration_ms=None if duration is None else round(duration * 1000, 3),
+            )
+        )
+    return results
+
+
+def _refresh_reports_periodically(stop: threading.Event) -> None:
+    """Refresh stale reports every REPORT_REFRESH_INTERVAL seconds.
+
+    Every worker runs this loop; the advisory lock and the age check in
+    ``refresh_report`` make sure each report is rebuilt once per interval.
+    """
+    interval = settings.report_refresh_interval
+    while not stop.wait(interval):
+        for report in REPORTS.values():
+            try:
+                refresh_report(get_engine(), report, max_age=interval)
+            except SQLAlchemyError as exc:
+                logger.warning("Refreshing report %s failed: %s", report.name, exc)
+
+
+@router.get("/api/db/export/{table_name}")
+def export_table_csv(
+    table_name: str,
+    column: str | None = Query(None, description="Optional column to filter by"),
+    query: str | None = Query(None, description="Substring to search for"),
+):
+    stmt = _export_select(table_name, column, query)
+    return StreamingResponse(
+        iter_copy_csv(get_engine(), stmt),
+        media_type=CSV_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.csv"'},
+    )
+
+
+@router.post("/api/db/export/{table_name}", response_model=schemas.OperationStatus)
+def export_table_csv_to_file(
+    table_name: str,
+    payload: schemas.CSVRequest | None = None,
+    column: str | None = Query(None, description="Optional column to filter by"),
+    query: str | None = Query(None, description="Substring to search for"),
+):
+    stmt = _export_select(table_name, column, query)
+    target_path = _csv_target(payload.filename if payload else None, f"{table_name}.csv")
+    try:
+        copy_csv_to_file(get_engine(), stmt, target_path)
+    except DB_ERRORS as exc:
+        raise HTTPException(status_code=400, detail=_db_error_message(exc)) from exc
+    return schemas.OperationStatus(message="CSV exported", path=str(target_path))
+
+
+@router.post("/api/db/csv", response_model=schemas.OperationStatus)
+def save_last_query_to_csv(
+    request: Request, payload: schemas.CSVRequest | None = None
+):
+    handle = payload.handle if payload and payload.handle else None
+    if handle is None:
+        handle = result_store.latest(_client_key(request))
+    # A handle from another worker may not have been flushed to disk yet.
+    stored = result_store.get(handle, wait=True) if handle else None
+    first_row = next(stored.rows, None) if stored else None
+    if stored is None or first_row is None:
+        raise HTTPException(
+            status_code=400, detail="No query executed or result is empty"
+        )
+    target_path = _csv_target(payload.filename if payload else None, "last_query.csv")
     with target_path.open("w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=last_query_result["columns"])
+        writer = csv.DictWriter(csv_file, fieldnames=stored.columns)
         writer.writeheader()
-        writer.writerows(last_query_result["rows"])
+        writer.writerow(first_row)
+        writer.writerows(stored.rows)
     return schemas.OperationStatus(message="CSV saved", path=str(target_path))
 
 
@@ -348,42 +1674,78 @@ def _build_pg_command(
     return base_args + extra_args, env
 
 
-@app.post("/api/db/backup", response_model=schemas.OperationStatus)
-def create_backup(
-    payload: schemas.BackupRequest, session: Session = Depends(get_session)
-):
-    del session  # session is unused but keeps dependency consistent
-    _confirm_superuser(payload.superuser_password)
-    url = make_url(settings.database_url)
-    backup_path = Path(payload.path)
-    if not backup_path.is_absolute():
-        backup_path = settings.backup_dir / backup_path
-    backup_path.parent.mkdir(parents=True, exist_ok=True)
-    cmd, env = _build_pg_command(
-        url, "pg_dump", ["-F", "c", "-d", url.database, "-f", str(backup_path)]
-    )
+def _run_pg_tool_sync(cmd: list[str], env: dict[str, str], failure: str) -> None:
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True, env=env)
+    except FileNotFoundError as exc:
+        raise HTTPException(
+            status_code=500, detail=f"{cmd[0]} not found: {exc}"
+        ) from exc
+    except subprocess.CalledProcessError as exc:
+        raise HTTPException(
+            status_code=500, detail=exc.stderr.strip() or failure
+        ) from exc
+
+
+async def _run_pg_tool(
+    operation: str, cmd: list[str], env: dict[str, str], failure: str
+) -> None:
+    """Run pg_dump/pg_restore and record its duration under ``operation``."""
+    started = time.perf_counter()
+    outcome = "failure"
+    try:
+        await _exec_pg_tool(cmd, env, failure)
+        outcome = "success"
+    finally:
+        metrics.observe(
+            "agency_db_tool_duration_seconds",
+            {"operation": operation, "outcome": outcome},
+            time.perf_counter() - started,
+        )
+
+
+async def _exec_pg_tool(cmd: list[str], env: dict[str, str], failure: str) -> None:
+    """Run pg_dump/pg_restore without tying up a threadpool worker in async mode."""
     complete_env = os.environ.copy()
     complete_env.update(env)
+    if not settings.db_async:
+        await run_in_threadpool(_run_pg_tool_sync, cmd, complete_env, failure)
+        return
     try:
-        subprocess.run(
-            cmd, check=True, capture_output=True, text=True, env=complete_env
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=complete_env,
         )
     except FileNotFoundError as exc:
         raise HTTPException(
             status_code=500, detail=f"{cmd[0]} not found: {exc}"
         ) from exc
-    except subprocess.CalledProcessError as exc:
+    _, stderr = await process.communicate()
+    if process.returncode:
         raise HTTPException(
-            status_code=500, detail=exc.stderr.strip() or "Backup failed"
-        ) from exc
+            status_code=500, detail=stderr.decode(errors="replace").strip() or failure
+        )
+
+
+@router.post("/api/db/backup", response_model=schemas.OperationStatus)
+async def create_backup(payload: schemas.BackupRequest):
+    _confirm_superuser(payload.superuser_password)
+    url = make_url(settings.database_url)
+    backup_path = Path(payload.path)
+    if not backup_path.is_absolute():
+        backup_path = settings.backup_dir / backup_path
+    backup_path.parent.mkdir(parents=True, exist_ok=True)
+    cmd, env = _build_pg_command(
+        url, "pg_dump", ["-F", "c", "-d", url.database, "-f", str(backup_path)]
+    )
+    await _run_pg_tool("backup", cmd, env, "Backup failed")
     return schemas.OperationStatus(message="Backup completed", path=str(backup_path))
 
 
-@app.post("/api/db/restore", response_model=schemas.OperationStatus)
-def restore_backup(
-    payload: schemas.RestoreRequest, session: Session = Depends(get_session)
-):
-    del session  # session is unused but keeps dependency consistent
+@router.post("/api/db/restore", response_model=schemas.OperationStatus)
+async def restore_backup(payload: schemas.RestoreRequest):
     _confirm_superuser(payload.superuser_password)
     url = make_url(settings.database_url)
     backup_path = Path(payload.path)
@@ -394,18 +1756,196 @@ def restore_backup(
         "pg_restore",
         ["-d", url.database, "-c", str(backup_path)],
     )
-    complete_env = os.environ.copy()
-    complete_env.update(env)
-    try:
-        subprocess.run(
-            cmd, check=True, capture_output=True, text=True, env=complete_env
-        )
-    except FileNotFoundError as exc:
-        raise HTTPException(
-            status_code=500, detail=f"{cmd[0]} not found: {exc}"
-        ) from exc
-    except subprocess.CalledProcessError as exc:
-        raise HTTPException(
-            status_code=500, detail=exc.stderr.strip() or "Restore failed"
-        ) from exc
+    await _run_pg_tool("restore", cmd, env, "Restore failed")
+    read_cache.clear()
     return schemas.OperationStatus(message="Restore completed", path=str(backup_path))
+
+
+@router.get("/api/startup")
+def startup_timings():
+    return startup_report.as_dict()
+
+
+@router.get("/api/db/pool")
+def pool_stats():
+    """Connection pool occupancy and checkout waits for this worker."""
+    pool = active_engine().pool
+    stats = pool.stats() if isinstance(pool, TimedQueuePool) else {"status": pool.status()}
+    return {"pid": os.getpid(), **stats, "query_cursors": query_cursors.stats()}
+
+
+@router.get("/api/cache")
+def cache_stats():
+    """Read cache hit/miss counters for this worker."""
+    return {
+        "pid": os.getpid(),
+        **read_cache.stats(),
+        "compiled_list_queries": compile_list_query.cache_info()._asdict(),
+    }
+
+
+def _component_metrics() -> Iterator[Sample]:
+    """Sample the pool, cache and cursor counters of this worker."""
+    pool = active_engine().pool
+    if isinstance(pool, TimedQueuePool):
+        stats = pool.stats()
+        for state in ("checked_out", "idle", "overflow"):
+            yield "agency_db_pool_connections", {"state": state}, stats[state]
+        yield "agency_db_pool_checkouts_total", {}, stats["checkouts"]
+        yield "agency_db_pool_checkout_timeouts_total", {}, stats["timeouts"]
+        wait_total, wait_max = stats["wait_total_ms"] / 1000, stats["wait_max_ms"] / 1000
+        yield "agency_db_pool_checkout_wait_seconds_total", {}, wait_total
+        yield "agency_db_pool_checkout_wait_max_seconds", {}, wait_max
+    cache = read_cache.stats()
+    if "hits" in cache:
+        yield "agency_cache_hits_total", {"cache": "read"}, cache["hits"]
+        yield "agency_cache_misses_total", {"cache": "read"}, cache["misses"]
+    compiled = compile_list_query.cache_info()
+    yield "agency_cache_hits_total", {"cache": "compiled_list_query"}, compiled.hits
+    yield "agency_cache_misses_total", {"cache": "compiled_list_query"}, compiled.misses
+    yield "agency_query_cursors_open", {}, query_cursors.stats()["open"]
+
+
+metrics = MetricsRegistry()
+metrics.add_collector(_component_metrics)
+metrics_store = MetricsStore(
+    settings.metrics_dir, settings.metrics_flush_interval, settings.metrics_retention
+)
+
+
+def _flush_metrics() -> None:
+    try:
+        metrics_store.write(metrics.snapshot())
+    except OSError as exc:
+        logger.warning("Writing metrics snapshot failed: %s", exc)
+
+
+def _flush_metrics_periodically(stop: threading.Event) -> None:
+    while not stop.wait(settings.metrics_flush_interval):
+        _flush_metrics()
+    _flush_metrics()
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus metrics of every worker sharing METRICS_DIR."""
+    # This worker's snapshot is refreshed first so the scrape sees its latest
+    # requests; the others are at most METRICS_FLUSH_INTERVAL seconds old.
+    _flush_metrics()
+    return Response(
+        render(metrics_store.read()), media_type="text/plain; version=0.0.4"
+    )
+
+
+def _warm_pool() -> None:
+    """Open DB_POOL_WARMUP connections off the request path."""
+    started = time.perf_counter()
+    try:
+        with get_engine().connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+        startup_report.record("first_connection", time.perf_counter() - started)
+        opened = warm_pool(get_engine(), settings.db_pool_warmup)
+    except SQLAlchemyError as exc:
+        logger.warning("Connection pool warmup failed: %s", exc)
+        return
+    _report_warmup(started, opened)
+
+
+async def _warm_async_pool() -> None:
+    """Asyncio counterpart of :func:`_warm_pool`, run as a startup task."""
+    started = time.perf_counter()
+    try:
+        async with get_async_engine().connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+        startup_report.record("first_connection", time.perf_counter() - started)
+        opened = await warm_async_pool(get_async_engine(), settings.db_pool_warmup)
+    except SQLAlchemyError as exc:
+        logger.warning("Connection pool warmup failed: %s", exc)
+        return
+    _report_warmup(started, opened)
+
+
+def _report_warmup(started: float, opened: int) -> None:
+    startup_report.record("pool_warmup", time.perf_counter() - started)
+    logger.info(
+        "Warmed %d pooled connection(s). Startup report: %s",
+        opened,
+        startup_report.as_dict(),
+    )
+
+
+@asynccontextmanager
+async def _lifespan(application: FastAPI) -> AsyncIterator[None]:
+    del application  # required by the lifespan signature
+    if settings.schema_bootstrap:
+        started = time.perf_counter()
+        await run_in_threadpool(migrations.upgrade, get_engine(), None, logger.info)
+        startup_report.record("schema_bootstrap", time.perf_counter() - started)
+    stop_refresh = threading.Event()
+    threading.Thread(
+        target=_flush_results_periodically,
+        args=(stop_refresh,),
+        name="result-store-flush",
+        daemon=True,
+    ).start()
+    threading.Thread(
+        target=_flush_metrics_periodically,
+        args=(stop_refresh,),
+        name="metrics-flush",
+        daemon=True,
+    ).start()
+    threading.Thread(
+        target=_expire_cursors_periodically,
+        args=(stop_refresh,),
+        name="cursor-expiry",
+        daemon=True,
+    ).start()
+    if settings.report_refresh_interval > 0:
+        threading.Thread(
+            target=_refresh_reports_periodically,
+            args=(stop_refresh,),
+            name="report-refresh",
+            daemon=True,
+        ).start()
+    if not settings.db_async:
+        threading.Thread(target=_warm_pool, name="pool-warmup", daemon=True).start()
+        yield
+        stop_refresh.set()
+        query_cursors.close_all()
+        return
+    warmup = asyncio.create_task(_warm_async_pool())
+    yield
+    stop_refresh.set()
+    query_cursors.close_all()
+    warmup.cancel()
+    await get_async_engine().dispose()
+
+
+def create_app() -> FastAPI:
+    """Build the application without touching the database.
+
+    Schema migrations only run here when SCHEMA_BOOTSTRAP is enabled; the
+    first connection is opened by a background warmup thread at startup.
+    """
+    started = time.perf_counter()
+    application = FastAPI(title="Agency API", version="1.0.0", lifespan=_lifespan)
+    application.add_middleware(MetricsMiddleware, registry=metrics)
+    # Outermost, so the SQL totals are collected for the metrics even when
+    # the Server-Timing header is turned off.
+    application.add_middleware(
+        ServerTimingMiddleware, send_header=settings.server_timing
+    )
+    crud_router = APIRouter()
+    register_program_routes(crud_router)
+    for table_name, configuration in TABLE_CONFIGS.items():
+        register_crud_routes(crud_router, table_name, configuration)
+    for relation_name, relation in RELATIONS.items():
+        register_relation_routes(crud_router, relation_name, relation)
+    application.include_router(crud_router)
+    application.include_router(router)
+    startup_report.record("routes", time.perf_counter() - started)
+    return application
+
+
+startup_report.record("import", time.perf_counter() - IMPORT_STARTED)
+app = create_app()
@@ -0,0 +1,301 @@
+"""Prometheus metrics aggregated across worker processes.
+
+Each worker keeps its own counters, histograms and gauges in memory and
+writes a JSON snapshot of them to ``<METRICS_DIR>/metrics-<pid>.json`` every
+``METRICS_FLUSH_INTERVAL`` seconds (atomically, like the result store). The
+``/metrics`` route sums every worker's latest snapshot, so whichever worker
+answers the scrape reports the whole deployment. Snapshots that stopped
+being refreshed belong to workers that exited: their counters still count,
+their gauges no longer do, and they are deleted after ``retention`` seconds.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .sql_timing import current_timing
+
+Labels = tuple[tuple[str, str], ...]
+# (name, labels, value) read from another component when a snapshot is taken.
+Sample = tuple[str, dict[str, str], float]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    kind: str  # "counter", "gauge" or "histogram"
+    help: str
+    buckets: tuple[float, ...] = ()
+
+
+METRICS: dict[str, MetricSpec] = {
+    "agency_http_request_duration_seconds": MetricSpec(
+        "histogram", "HTTP request latency by route.", LATENCY_BUCKETS
+    ),
+    "agency_http_requests_in_flight": MetricSpec(
+        "gauge", "HTTP requests being served."
+    ),
+    "agency_http_response_rows_total": MetricSpec(
+        "counter", "Rows returned or changed by SQL statements, by route."
+    ),
+    "agency_http_db_seconds_total": MetricSpec(
+        "counter", "Time spent in SQL statements, by route."
+    ),
+    "agency_http_db_statements_total": MetricSpec(
+        "counter", "SQL statements executed, by route."
+    ),
+    "agency_db_pool_connections": MetricSpec(
+        "gauge", "Pooled database connections by state."
+    ),
+    "agency_db_pool_checkouts_total": MetricSpec(
+        "counter", "Connections checked out of the pool."
+    ),
+    "agency_db_pool_checkout_wait_seconds_total": MetricSpec(
+        "counter", "Time spent waiting for pooled connections."
+    ),
+    "agency_db_pool_checkout_wait_max_seconds": MetricSpec(
+        "gauge", "Longest pool checkout wait of any worker."
+    ),
+    "agency_db_pool_checkout_timeouts_total": MetricSpec(
+        "counter", "Pool checkouts that timed out."
+    ),
+    "agency_cache_hits_total": MetricSpec("counter", "Cache hits by cache."),
+    "agency_cache_misses_total": MetricSpec("counter", "Cache misses by cache."),
+    "agency_cache_hit_ratio": MetricSpec(
+        "gauge", "Hits over lookups since the workers started, by cache."
+    ),
+    "agency_query_cursors_open": MetricSpec(
+        "gauge", "Server-side cursors held open for ad-hoc SQL."
+    ),
+    "agency_db_tool_duration_seconds": MetricSpec(
+        "histogram", "Duration of pg_dump/pg_restore runs.", DURATION_BUCKETS
+    ),
+}
+
+# Gauges aggregated with max() instead of a sum across workers.
+MAX_GAUGES = frozenset({"agency_db_pool_checkout_wait_max_seconds"})
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """The metrics of one worker process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, Labels], float] = {}
+        # Histogram state: per-bucket counts (the last one is +Inf), then sum.
+        self._histograms: dict[tuple[str, Labels], list[float]] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def inc(self, name: str, labels: dict[str, str], value: float = 1.0) -> None:
+        """Add ``value`` to a counter or gauge."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: dict[str, str], value: float) -> None:
+        buckets = METRICS[name].buckets
+        key = (name, _labels(labels))
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [0.0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(buckets)] += 1
+            state[-1] += value
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Sample metrics owned by another component whenever a snapshot is taken."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict[str, list[Any]]:
+        samples: list[list[Any]] = []
+        for collector in self._collectors:
+            samples += [[name, labels, value] for name, labels, value in collector()]
+        with self._lock:
+            values = [
+                [name, dict(labels), value]
+                for (name, labels), value in self._values.items()
+            ]
+            histograms = [
+                [name, dict(labels), list(state)]
+                for (name, labels), state in self._histograms.items()
+            ]
+        return {"values": values + samples, "histograms": histograms}
+
+
+class MetricsStore:
+    """Per-worker snapshot files in a directory shared by all workers."""
+
+    def __init__(self, directory: Path, interval: float, retention: float) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.retention = retention
+
+    def write(self, snapshot: dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(snapshot, handle)
+        os.replace(tmp_name, self.directory / f"metrics-{os.getpid()}.json")
+
+    def read(self) -> list[tuple[dict[str, Any], bool]]:
+        """Return every snapshot and whether its worker is still refreshing it."""
+        now = time.time()
+        snapshots = []
+        for path in self.directory.glob("metrics-*.json"):
+            try:
+                age = now - path.stat().st_mtime
+                if age > self.retention:
+                    path.unlink(missing_ok=True)
+                    continue
+                snapshot = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue  # Replaced or removed while being read.
+            snapshots.append((snapshot, age <= 3 * self.interval))
+        return snapshots
+
+
+def _merge(
+    snapshots: list[tuple[dict[str, Any], bool]],
+) -> tuple[dict[tuple[str, Labels], float], dict[tuple[str, Labels], list[float]]]:
+    values: dict[tuple[str, Labels], float] = {}
+    histograms: dict[tuple[str, Labels], list[float]] = {}
+    for snapshot, live in snapshots:
+        for name, labels, value in snapshot.get("values", ()):
+            spec = METRICS.get(name)
+            if spec is None or (spec.kind == "gauge" and not live):
+                continue
+            key = (name, _labels(labels))
+            if name in MAX_GAUGES:
+                values[key] = max(values.get(key, 0.0), value)
+            else:
+                values[key] = values.get(key, 0.0) + value
+        for name, labels, state in snapshot.get("histograms", ()):
+            if name not in METRICS:
+                continue
+            key = (name, _labels(labels))
+            merged = histograms.get(key)
+            if merged is None or len(merged) != len(state):
+                histograms[key] = list(state)
+            else:
+                histograms[key] = [a + b for a, b in zip(merged, state)]
+    return values, histograms
+
+
+def _hit_ratios(values: dict[tuple[str, Labels], float]) -> None:
+    for (name, labels), hits in list(values.items()):
+        if name != "agency_cache_hits_total":
+            continue
+        lookups = hits + values.get(("agency_cache_misses_total", labels), 0.0)
+        values[("agency_cache_hit_ratio", labels)] = hits / lookups if lookups else 0.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render(snapshots: list[tuple[dict[str, Any], bool]]) -> str:
+    """Render the merged snapshots in the Prometheus text exposition format."""
+    values, histograms = _merge(snapshots)
+    _hit_ratios(values)
+    lines: list[str] = []
+
+    def sample(name: str, labels: Iterable[tuple[str, str]], value: float) -> None:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name, spec in METRICS.items():
+        lines += [f"# HELP {name} {spec.help}", f"# TYPE {name} {spec.kind}"]
+        if spec.kind != "histogram":
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    sample(name, labels, value)
+            continue
+        for (metric, labels), state in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0.0
+            for bound, count in zip((*spec.buckets, math.inf), state):
+                cumulative += count
+                sample(f"{name}_bucket", (*labels, ("le", _format_value(bound))), cumulative)
+            sample(f"{name}_sum", labels, state[-1])
+            sample(f"{name}_count", labels, cumulative)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Record latency, in-flight requests and SQL totals per route.
+
+    Routes are labelled with their path template (``/api/artist/{item_id}``),
+    and requests no route matched with ``unmatched``, so label values stay
+    bounded. Must run inside ``ServerTimingMiddleware`` for the SQL totals.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope.get("method", "")
+        status = {"code": 500}
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        self.registry.inc("agency_http_requests_in_flight", {"method": method})
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.registry.inc("agency_http_requests_in_flight", {"method": method}, -1)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = {"method": method, "route": route}
+            self.registry.observe(
+                "agency_http_request_duration_seconds",
+                {**labels, "status": f"{status['code'] // 100}xx"},
+                elapsed,
+            )
+            timing = current_timing()
+            if timing is not None:
+                self.registry.inc("agency_http_response_rows_total", labels, timing.rows)
+                self.registry.inc("agency_http_db_seconds_total", labels, timing.db_seconds)
+                self.registry.inc(
+                    "agency_http_db_statements_total", labels, timing.statements
+                )
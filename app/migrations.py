@@ -0,0 +1,665 @@
+"""Versioned schema migrations, applied out of band.
+
+Application workers never run DDL. Apply pending migrations with::
+
+    python -m app.migrations upgrade
+    python -m app.migrations status
+
+Each migration creates model tables (``CREATE TABLE IF NOT EXISTS``), runs
+its SQL in one transaction and then builds the named model indexes with
+``CREATE INDEX CONCURRENTLY`` so that writes are never blocked. Concurrent
+index builds cannot run inside a transaction, so every step is idempotent: a
+migration interrupted half way is simply re-run, and indexes left invalid by
+a failed concurrent build are dropped and rebuilt.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import Index, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from . import models  # noqa: F401  # registers every table on the metadata
+from .database import Base, get_engine
+
+SCHEMA = "agency"
+VERSION_TABLE = f"{SCHEMA}.schema_migrations"
+# Arbitrary application-wide key for pg_advisory_lock.
+LOCK_KEY = 7_310_251
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    tables: tuple[str, ...] = ()
+    sql: tuple[str, ...] = ()
+    indexes: tuple[str, ...] = ()
+    drop_indexes: tuple[str, ...] = ()
+
+
+# The SQL of every migration is frozen as literal text once it has shipped:
+# databases that applied it keep what it did then, so a fresh database must
+# get exactly the same. Behaviour changes go in a new migration.
+
+# Migration 5: statement triggers bumping agency.table_version on every write
+# to the versioned tables (see models.TableVersion).
+MIGRATION_5_SQL = (
+    """
+CREATE OR REPLACE FUNCTION agency.bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO agency.table_version AS tv (table_name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = tv.version + 1;
+    RETURN NULL;
+END
+$$
+""",
+    "DROP TRIGGER IF EXISTS organizer_version ON agency.organizer",
+    "CREATE TRIGGER organizer_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.organizer FOR EACH STATEMENT "
+    "EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS venue_version ON agency.venue",
+    "CREATE TRIGGER venue_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.venue FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS artist_version ON agency.artist",
+    "CREATE TRIGGER artist_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.artist FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS client_version ON agency.client",
+    "CREATE TRIGGER client_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.client FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS performance_version ON agency.performance",
+    "CREATE TRIGGER performance_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.performance FOR EACH STATEMENT "
+    "EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS concert_program_version ON agency.concert_program",
+    "CREATE TRIGGER concert_program_version "
+    "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON agency.concert_program "
+    "FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    # The sales triggers bump versions from now on.
+    "DROP TRIGGER IF EXISTS ticket_version ON agency.ticket",
+    "CREATE TRIGGER ticket_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.ticket FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS test_version ON agency.test",
+    "CREATE TRIGGER test_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.test FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS artist_performance_version ON agency.artist_performance",
+    "CREATE TRIGGER artist_performance_version "
+    "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON agency.artist_performance "
+    "FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS organizer_concert_program_version "
+    "ON agency.organizer_concert_program",
+    "CREATE TRIGGER organizer_concert_program_version "
+    "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON agency.organizer_concert_program "
+    "FOR EACH STATEMENT EXECUTE FUNCTION agency.bump_table_version()",
+    "DROP TRIGGER IF EXISTS performance_concert_program_version "
+    "ON agency.performance_concert_program",
+    "CREATE TRIGGER performance_concert_program_version "
+    "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+    "ON agency.performance_concert_program FOR EACH STATEMENT "
+    "EXECUTE FUNCTION agency.bump_table_version()",
+)
+
+# Migration 6: reporting materialized views (see app.reports).
+MIGRATION_6_SQL = (
+    """
+CREATE MATERIALIZED VIEW IF NOT EXISTS agency.report_program_revenue AS
+SELECT cp.id AS concert_program_id,
+       cp.title,
+       cp.date,
+       count(t.id) AS tickets_sold,
+       coalesce(sum(t.price), 0) AS revenue,
+       round(coalesce(avg(t.price), 0), 2)::float8 AS average_price
+FROM agency.concert_program cp
+LEFT JOIN agency.ticket t ON t.concert_program_id = cp.id
+GROUP BY cp.id
+WITH DATA
+""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS report_program_revenue_key "
+    "ON agency.report_program_revenue (concert_program_id)",
+    "INSERT INTO agency.report_refresh (view_name, refreshed_at, duration_ms) "
+    "VALUES ('program_revenue', now(), 0) ON CONFLICT (view_name) DO NOTHING",
+    """
+CREATE MATERIALIZED VIEW IF NOT EXISTS agency.report_sell_through AS
+SELECT cp.id AS concert_program_id,
+       cp.title,
+       cp.date,
+       v.id AS venue_id,
+       v.name AS venue_name,
+       v.capacity,
+       count(t.id) AS tickets_sold,
+       CASE WHEN v.capacity > 0
+            THEN round(count(t.id)::numeric / v.capacity, 4)::float8
+       END AS sell_through,
+       CASE WHEN v.capacity IS NOT NULL
+            THEN greatest(v.capacity - count(t.id), 0)
+       END AS seats_remaining
+FROM agency.concert_program cp
+LEFT JOIN agency.venue v ON v.id = cp.venue_id
+LEFT JOIN agency.ticket t ON t.concert_program_id = cp.id
+GROUP BY cp.id, v.id
+WITH DATA
+""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS report_sell_through_key "
+    "ON agency.report_sell_through (concert_program_id)",
+    "INSERT INTO agency.report_refresh (view_name, refreshed_at, duration_ms) "
+    "VALUES ('sell_through', now(), 0) ON CONFLICT (view_name) DO NOTHING",
+    """
+CREATE MATERIALIZED VIEW IF NOT EXISTS agency.report_program_lineup AS
+SELECT cp.id AS concert_program_id,
+       cp.title,
+       cp.date,
+       count(DISTINCT pcp.performance_id) AS performances,
+       count(DISTINCT ap.artist_id) AS artists,
+       (SELECT count(*)
+        FROM agency.organizer_concert_program ocp
+        WHERE ocp.concert_program_id = cp.id) AS organizers
+FROM agency.concert_program cp
+LEFT JOIN agency.performance_concert_program pcp
+       ON pcp.concert_program_id = cp.id
+LEFT JOIN agency.artist_performance ap
+       ON ap.performance_id = pcp.performance_id
+GROUP BY cp.id
+WITH DATA
+""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS report_program_lineup_key "
+    "ON agency.report_program_lineup (concert_program_id)",
+    "INSERT INTO agency.report_refresh (view_name, refreshed_at, duration_ms) "
+    "VALUES ('program_lineup', now(), 0) ON CONFLICT (view_name) DO NOTHING",
+)
+
+# Migration 7: ticket number sequence and sales counters.
+MIGRATION_7_SQL = (
+    "CREATE SEQUENCE IF NOT EXISTS agency.ticket_number_seq",
+    """
+CREATE OR REPLACE FUNCTION agency.count_ticket_sales() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    oversold record;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM agency.ticket_sales;
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NOT EXISTS (
+        SELECT 1 FROM new_tickets n JOIN old_tickets o USING (id)
+        WHERE n.concert_program_id IS DISTINCT FROM o.concert_program_id
+    ) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE agency.ticket_sales s SET sold = s.sold - o.sold
+        FROM (
+            SELECT concert_program_id, count(*) AS sold FROM old_tickets
+            WHERE concert_program_id IS NOT NULL GROUP BY concert_program_id
+        ) o
+        WHERE s.concert_program_id = o.concert_program_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO agency.ticket_sales AS s (concert_program_id, sold)
+        SELECT concert_program_id, count(*) FROM new_tickets
+        WHERE concert_program_id IS NOT NULL
+        GROUP BY concert_program_id ORDER BY concert_program_id
+        ON CONFLICT (concert_program_id) DO UPDATE SET sold = s.sold + excluded.sold;
+        SELECT s.concert_program_id, s.sold, v.capacity INTO oversold
+        FROM agency.ticket_sales s
+        JOIN agency.concert_program cp ON cp.id = s.concert_program_id
+        JOIN agency.venue v ON v.id = cp.venue_id
+        WHERE s.concert_program_id IN (SELECT concert_program_id FROM new_tickets)
+          AND s.sold > v.capacity
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Concert program % is sold out: % tickets for % seats',
+                oversold.concert_program_id, oversold.sold, oversold.capacity
+                USING ERRCODE = 'check_violation',
+                      CONSTRAINT = 'ticket_capacity_check';
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$
+""",
+    # Triggers first: creating them locks out ticket writes until the
+    # backfill below commits, so no sale is counted twice or missed.
+    "DROP TRIGGER IF EXISTS ticket_sales_insert ON agency.ticket",
+    "CREATE TRIGGER ticket_sales_insert AFTER INSERT ON agency.ticket "
+    "REFERENCING NEW TABLE AS new_tickets FOR EACH STATEMENT "
+    "EXECUTE FUNCTION agency.count_ticket_sales()",
+    "DROP TRIGGER IF EXISTS ticket_sales_update ON agency.ticket",
+    "CREATE TRIGGER ticket_sales_update AFTER UPDATE ON agency.ticket "
+    "REFERENCING OLD TABLE AS old_tickets NEW TABLE AS new_tickets FOR EACH STATEMENT "
+    "EXECUTE FUNCTION agency.count_ticket_sales()",
+    "DROP TRIGGER IF EXISTS ticket_sales_delete ON agency.ticket",
+    "CREATE TRIGGER ticket_sales_delete AFTER DELETE ON agency.ticket "
+    "REFERENCING OLD TABLE AS old_tickets FOR EACH STATEMENT "
+    "EXECUTE FUNCTION agency.count_ticket_sales()",
+    "DROP TRIGGER IF EXISTS ticket_sales_truncate ON agency.ticket",
+    "CREATE TRIGGER ticket_sales_truncate AFTER TRUNCATE ON agency.ticket "
+    "FOR EACH STATEMENT EXECUTE FUNCTION agency.count_ticket_sales()",
+    "INSERT INTO agency.ticket_sales (concert_program_id, sold) "
+    "SELECT concert_program_id, count(*) FROM agency.ticket "
+    "WHERE concert_program_id IS NOT NULL GROUP BY concert_program_id "
+    "ON CONFLICT (concert_program_id) DO UPDATE SET sold = excluded.sold",
+)
+
+# Migration 8: transition tables confined to their events' branches.
+MIGRATION_8_SQL = (
+    """
+CREATE OR REPLACE FUNCTION agency.count_ticket_sales() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    oversold record;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM agency.ticket_sales;
+        RETURN NULL;
+    END IF;
+    -- Transition tables only exist for the events that define them, so each
+    -- reference must sit in a branch that only that event reaches.
+    IF TG_OP = 'UPDATE' THEN
+        IF NOT EXISTS (
+            SELECT 1 FROM new_tickets n JOIN old_tickets o USING (id)
+            WHERE n.concert_program_id IS DISTINCT FROM o.concert_program_id
+        ) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE agency.ticket_sales s SET sold = s.sold - o.sold
+        FROM (
+            SELECT concert_program_id, count(*) AS sold FROM old_tickets
+            WHERE concert_program_id IS NOT NULL GROUP BY concert_program_id
+        ) o
+        WHERE s.concert_program_id = o.concert_program_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO agency.ticket_sales AS s (concert_program_id, sold)
+        SELECT concert_program_id, count(*) FROM new_tickets
+        WHERE concert_program_id IS NOT NULL
+        GROUP BY concert_program_id ORDER BY concert_program_id
+        ON CONFLICT (concert_program_id) DO UPDATE SET sold = s.sold + excluded.sold;
+        SELECT s.concert_program_id, s.sold, v.capacity INTO oversold
+        FROM agency.ticket_sales s
+        JOIN agency.concert_program cp ON cp.id = s.concert_program_id
+        JOIN agency.venue v ON v.id = cp.venue_id
+        WHERE s.concert_program_id IN (SELECT concert_program_id FROM new_tickets)
+          AND s.sold > v.capacity
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Concert program % is sold out: % tickets for % seats',
+                oversold.concert_program_id, oversold.sold, oversold.capacity
+                USING ERRCODE = 'check_violation',
+                      CONSTRAINT = 'ticket_capacity_check';
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$
+""",
+)
+
+# Migration 9: statement triggers with transition tables make one counter
+# update per program touched, however many tickets the statement writes.
+# Counter rows are upserted in program order so that multi-program
+# statements cannot deadlock. The same upsert bumps the version of every
+# program touched, which is what the ticket ETags are built from: ticket
+# writes never queue on the shared agency.table_version row, which only
+# counts truncates and tickets without a program. Transition tables only
+# exist for the events that define them, so each event has its own branch.
+MIGRATION_9_SQL = (
+    "ALTER TABLE agency.ticket_sales "
+    "ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0",
+    """
+CREATE OR REPLACE FUNCTION agency.count_ticket_sales() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    oversold record;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM agency.ticket_sales;
+        INSERT INTO agency.table_version AS tv (table_name, version) VALUES ('ticket', 1) ON CONFLICT (table_name) DO UPDATE SET version = tv.version + 1;
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO agency.ticket_sales AS s (concert_program_id, sold, version)
+        SELECT concert_program_id, sum(delta), 1 FROM (SELECT concert_program_id, 1 AS delta FROM new_tickets) c
+        WHERE concert_program_id IS NOT NULL
+        GROUP BY concert_program_id ORDER BY concert_program_id
+        ON CONFLICT (concert_program_id) DO UPDATE
+            SET sold = s.sold + excluded.sold, version = s.version + 1;
+        IF EXISTS (SELECT 1 FROM (SELECT concert_program_id, 1 AS delta FROM new_tickets) c WHERE concert_program_id IS NULL) THEN
+            INSERT INTO agency.table_version AS tv (table_name, version) VALUES ('ticket', 1) ON CONFLICT (table_name) DO UPDATE SET version = tv.version + 1;
+        END IF;
+        -- Only programs that gained tickets can have been oversold by this
+        -- statement.
+        SELECT s.concert_program_id, s.sold, v.capacity INTO oversold
+        FROM agency.ticket_sales s
+        JOIN agency.concert_program cp ON cp.id = s.concert_program_id
+        JOIN agency.venue v ON v.id = cp.venue_id
+        WHERE s.concert_program_id IN (
+            SELECT concert_program_id FROM (SELECT concert_program_id, 1 AS delta FROM new_tickets) c
+            GROUP BY concert_program_id HAVING sum(delta) > 0
+        )
+          AND s.sold > v.capacity
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Concert program % is sold out: % tickets for % seats',
+                oversold.concert_program_id, oversold.sold, oversold.capacity
+                USING ERRCODE = 'check_violation',
+                      CONSTRAINT = 'ticket_capacity_check';
+        END IF;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO agency.ticket_sales AS s (concert_program_id, sold, version)
+        SELECT concert_program_id, sum(delta), 1 FROM (SELECT concert_program_id, 1 AS delta FROM new_tickets UNION ALL SELECT concert_program_id, -1 FROM old_tickets) c
+        WHERE concert_program_id IS NOT NULL
+        GROUP BY concert_program_id ORDER BY concert_program_id
+        ON CONFLICT (concert_program_id) DO UPDATE
+            SET sold = s.sold + excluded.sold, version = s.version + 1;
+        IF EXISTS (SELECT 1 FROM (SELECT concert_program_id, 1 AS delta FROM new_tickets UNION ALL SELECT concert_program_id, -1 FROM old_tickets) c WHERE concert_program_id IS NULL) THEN
+            INSERT INTO agency.table_version AS tv (table_name, version) VALUES ('ticket', 1) ON CONFLICT (table_name) DO UPDATE SET version = tv.version + 1;
+        END IF;
+        -- Only programs that gained tickets can have been oversold by this
+        -- statement.
+        SELECT s.concert_program_id, s.sold, v.capacity INTO oversold
+        FROM agency.ticket_sales s
+        JOIN agency.concert_program cp ON cp.id = s.concert_program_id
+        JOIN agency.venue v ON v.id = cp.venue_id
+        WHERE s.concert_program_id IN (
+            SELECT concert_program_id FROM (SELECT concert_program_id, 1 AS delta FROM new_tickets UNION ALL SELECT concert_program_id, -1 FROM old_tickets) c
+            GROUP BY concert_program_id HAVING sum(delta) > 0
+        )
+          AND s.sold > v.capacity
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Concert program % is sold out: % tickets for % seats',
+                oversold.concert_program_id, oversold.sold, oversold.capacity
+                USING ERRCODE = 'check_violation',
+                      CONSTRAINT = 'ticket_capacity_check';
+        END IF;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO agency.ticket_sales AS s (concert_program_id, sold, version)
+        SELECT concert_program_id, sum(delta), 1 FROM (SELECT concert_program_id, -1 AS delta FROM old_tickets) c
+        WHERE concert_program_id IS NOT NULL
+        GROUP BY concert_program_id ORDER BY concert_program_id
+        ON CONFLICT (concert_program_id) DO UPDATE
+            SET sold = s.sold + excluded.sold, version = s.version + 1;
+        IF EXISTS (SELECT 1 FROM (SELECT concert_program_id, -1 AS delta FROM old_tickets) c WHERE concert_program_id IS NULL) THEN
+            INSERT INTO agency.table_version AS tv (table_name, version) VALUES ('ticket', 1) ON CONFLICT (table_name) DO UPDATE SET version = tv.version + 1;
+        END IF;
+        -- Only programs that gained tickets can have been oversold by this
+        -- statement.
+        SELECT s.concert_program_id, s.sold, v.capacity INTO oversold
+        FROM agency.ticket_sales s
+        JOIN agency.concert_program cp ON cp.id = s.concert_program_id
+        JOIN agency.venue v ON v.id = cp.venue_id
+        WHERE s.concert_program_id IN (
+            SELECT concert_program_id FROM (SELECT concert_program_id, -1 AS delta FROM old_tickets) c
+            GROUP BY concert_program_id HAVING sum(delta) > 0
+        )
+          AND s.sold > v.capacity
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Concert program % is sold out: % tickets for % seats',
+                oversold.concert_program_id, oversold.sold, oversold.capacity
+                USING ERRCODE = 'check_violation',
+                      CONSTRAINT = 'ticket_capacity_check';
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$
+""",
+    # The sales triggers bump versions from now on.
+    "DROP TRIGGER IF EXISTS ticket_version ON agency.ticket",
+)
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "baseline tables",
+        tables=(
+            "organizer",
+            "venue",
+            "artist",
+            "client",
+            "performance",
+            "concert_program",
+            "ticket",
+            "test",
+            "artist_performance",
+            "organizer_concert_program",
+            "performance_concert_program",
+        ),
+    ),
+    Migration(
+        2,
+        "trigram indexes for substring filters",
+        sql=("CREATE EXTENSION IF NOT EXISTS pg_trgm",),
+        indexes=(
+            "ix_organizer_full_name_trgm",
+            "ix_organizer_phone_trgm",
+            "ix_venue_name_trgm",
+            "ix_venue_address_trgm",
+            "ix_artist_full_name_trgm",
+            "ix_artist_genre_trgm",
+            "ix_artist_phone_number_trgm",
+            "ix_client_full_name_trgm",
+            "ix_client_phone_trgm",
+            "ix_client_email_trgm",
+            "ix_performance_title_trgm",
+            "ix_performance_genre_trgm",
+            "ix_concert_program_title_trgm",
+            "ix_concert_program_address_trgm",
+            "ix_ticket_ticket_number_trgm",
+            "ix_ticket_place_trgm",
+            "ix_ticket_address_trgm",
+        ),
+    ),
+    Migration(
+        3,
+        "full-text search indexes",
+        indexes=(
+            "ix_artist_search",
+            "ix_client_search",
+            "ix_concert_program_search",
+            "ix_organizer_search",
+            "ix_performance_search",
+            "ix_venue_search",
+        ),
+    ),
+    Migration(
+        4,
+        "foreign key and date indexes",
+        indexes=(
+            "ix_artist_organizer_id",
+            "ix_client_organizer_id",
+            "ix_concert_program_venue_id",
+            "ix_concert_program_date",
+            "ix_ticket_client_id",
+            "ix_ticket_concert_program_id",
+            "ix_ticket_date",
+            "ix_artist_performance_performance_id",
+            "ix_organizer_concert_program_concert_program_id",
+            "ix_performance_concert_program_concert_program_id",
+        ),
+        # Duplicates of the primary keys created by earlier create_all() runs.
+        drop_indexes=(
+            "ix_agency_organizer_id",
+            "ix_agency_venue_id",
+            "ix_agency_artist_id",
+            "ix_agency_client_id",
+            "ix_agency_performance_id",
+            "ix_agency_concert_program_id",
+            "ix_agency_ticket_id",
+            "ix_agency_test_id",
+        ),
+    ),
+    Migration(
+        5,
+        "table version counters for ETags",
+        tables=("table_version",),
+        sql=MIGRATION_5_SQL,
+    ),
+    Migration(
+        6,
+        "reporting materialized views",
+        tables=("report_refresh",),
+        sql=MIGRATION_6_SQL,
+    ),
+    Migration(
+        7,
+        "ticket issuance: number sequence, sales counters and seat index",
+        tables=("ticket_sales",),
+        sql=MIGRATION_7_SQL,
+        indexes=("ix_ticket_concert_program_place",),
+    ),
+    Migration(
+        8,
+        "ticket sales trigger: confine transition tables to their events",
+        sql=MIGRATION_8_SQL,
+    ),
+    Migration(
+        9,
+        "ticket ETag versions per concert program",
+        sql=MIGRATION_9_SQL,
+    ),
+)
+
+
+def _model_indexes() -> dict[str, Index]:
+    return {
+        index.name: index
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+        if index.name
+    }
+
+
+def _create_index_sql(index: Index, connection: Connection) -> str:
+    sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+    return sql.replace("INDEX", "INDEX CONCURRENTLY", 1)
+
+
+def _drop_invalid_index(connection: Connection, name: str) -> None:
+    """Drop an index left INVALID by an interrupted concurrent build."""
+    invalid = connection.execute(
+        text(
+            "SELECT 1 FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"schema": SCHEMA, "name": name},
+    ).first()
+    if invalid:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.{name}"))
+
+
+def _ensure_version_table(connection: Connection) -> None:
+    connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "description TEXT NOT NULL, "
+            "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+    )
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    """Return the set of migration versions recorded in the database."""
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        return set(connection.scalars(text(f"SELECT version FROM {VERSION_TABLE}")))
+
+
+def _apply(engine: Engine, autocommit: Connection, migration: Migration) -> None:
+    indexes = _model_indexes()
+    with engine.begin() as connection:
+        for table_name in migration.tables:
+            table = Base.metadata.tables[f"{SCHEMA}.{table_name}"]
+            connection.execute(CreateTable(table, if_not_exists=True))
+        for statement in migration.sql:
+            connection.execute(text(statement))
+    for name in migration.indexes:
+        _drop_invalid_index(autocommit, name)
+        autocommit.exec_driver_sql(_create_index_sql(indexes[name], autocommit))
+    for name in migration.drop_indexes:
+        autocommit.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.{name}"))
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                f"INSERT INTO {VERSION_TABLE} (version, description) "
+                "VALUES (:version, :description) ON CONFLICT (version) DO NOTHING"
+            ),
+            {"version": migration.version, "description": migration.description},
+        )
+
+
+def upgrade(
+    engine: Engine | None = None,
+    target: int | None = None,
+    log: Callable[[str], None] = print,
+) -> list[int]:
+    """Apply pending migrations up to ``target`` and return their versions.
+
+    A session-level advisory lock serializes concurrent runs, e.g. several
+    deploy jobs starting at once.
+    """
+    engine = engine or get_engine()
+    applied: list[int] = []
+    with engine.connect() as lock_connection:
+        autocommit = lock_connection.execution_options(isolation_level="AUTOCOMMIT")
+        autocommit.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        try:
+            done = applied_versions(engine)
+            for migration in MIGRATIONS:
+                if migration.version in done:
+                    continue
+                if target is not None and migration.version > target:
+                    break
+                log(f"Applying {migration.version}: {migration.description}")
+                _apply(engine, autocommit, migration)
+                applied.append(migration.version)
+        finally:
+            autocommit.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY}
+            )
+    return applied
+
+
+def pending(engine: Engine | None = None) -> list[Migration]:
+    done = applied_versions(engine or get_engine())
+    return [migration for migration in MIGRATIONS if migration.version not in done]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Agency API schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--target", type=int, default=None)
+    commands.add_parser("status", help="list pending migrations")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        versions = upgrade(target=args.target)
+        print(f"Applied {len(versions)} migration(s).")
+    else:
+        waiting = pending()
+        for migration in waiting:
+            print(f"pending {migration.version}: {migration.description}")
+        if not waiting:
+            print("Schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
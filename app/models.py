@@ -1,37 +1,91 @@
-from sqlalchemy import CheckConstraint, Date, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql.elements import ColumnElement
 
 from .database import Base
 
+def trigram_index(table: str, column: str) -> Index:
+    """Return a trigram GIN index on ``column`` for substring and prefix filters.
+
+    It lets ILIKE '%...%' use an index instead of a sequential scan. The
+    pg_trgm extension it needs is created by migration 2.
+    """
+    return Index(
+        f"ix_{table}_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+
+
+def search_document(*columns: Any) -> ColumnElement:
+    """Return the ``tsvector`` expression indexed for full-text search.
+
+    Constants are rendered inline (never as bound parameters) so that queries
+    reproduce the index expression exactly and the planner can use it.
+    """
+    empty = literal_column("''")
+    document = func.coalesce(columns[0], empty)
+    for column in columns[1:]:
+        document = document.op("||")(literal_column("' '")).op("||")(
+            func.coalesce(column, empty)
+        )
+    return func.to_tsvector(literal_column("'simple'::regconfig"), document)
+
 
 class Organizer(Base):
     __tablename__ = "organizer"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     full_name: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=False)
     position: Mapped[str] = mapped_column("position", String(100), nullable=False)
     work_experience: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
-    __table_args__ = (CheckConstraint("work_experience >= 0", name="organizer_work_experience_check"),)
+    __table_args__ = (
+        CheckConstraint("work_experience >= 0", name="organizer_work_experience_check"),
+        trigram_index("organizer", "full_name"),
+        trigram_index("organizer", "phone"),
+    )
 
 
 class Venue(Base):
     __tablename__ = "venue"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     address: Mapped[str] = mapped_column(String(255), nullable=False)
     capacity: Mapped[int | None] = mapped_column(Integer, nullable=True)
     type: Mapped[str] = mapped_column(String(50), nullable=False)
 
-    __table_args__ = (CheckConstraint("capacity > 0", name="venue_capacity_check"),)
+    __table_args__ = (
+        CheckConstraint("capacity > 0", name="venue_capacity_check"),
+        trigram_index("venue", "name"),
+        trigram_index("venue", "address"),
+    )
 
 
 class Artist(Base):
     __tablename__ = "artist"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     full_name: Mapped[str] = mapped_column(String(255), nullable=False)
     genre: Mapped[str] = mapped_column(String(100), nullable=False)
     organizer_id: Mapped[int | None] = mapped_column(
@@ -42,13 +96,19 @@ class Artist(Base):
     phone_number: Mapped[str | None] = mapped_column(String(20), nullable=True)
     work_experience: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
-    __table_args__ = (CheckConstraint("work_experience >= 0", name="artist_work_experience_check"),)
+    __table_args__ = (
+        CheckConstraint("work_experience >= 0", name="artist_work_experience_check"),
+        trigram_index("artist", "full_name"),
+        trigram_index("artist", "genre"),
+        trigram_index("artist", "phone_number"),
+        Index("ix_artist_organizer_id", "organizer_id"),
+    )
 
 
 class Client(Base):
     __tablename__ = "client"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     full_name: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=False)
     email: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -59,25 +119,39 @@ class Client(Base):
         nullable=True,
     )
 
-    __table_args__ = (CheckConstraint("age >= 0", name="client_age_check"),)
+    __table_args__ = (
+        CheckConstraint("age >= 0", name="client_age_check"),
+        trigram_index("client", "full_name"),
+        trigram_index("client", "phone"),
+        trigram_index("client", "email"),
+        Index("ix_client_organizer_id", "organizer_id"),
+    )
 
 
 class Performance(Base):
     __tablename__ = "performance"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     duration: Mapped[int | None] = mapped_column(Integer, nullable=True)
     genre: Mapped[str] = mapped_column(String(100), nullable=False)
     number_of_artists: Mapped[int] = mapped_column(Integer, nullable=False)
 
-    __table_args__ = (CheckConstraint("duration > 0", name="performance_duration_check"),)
+    artists: Mapped[list["Artist"]] = relationship(
+        secondary="agency.artist_performance", order_by="Artist.id", viewonly=True
+    )
+
+    __table_args__ = (
+        CheckConstraint("duration > 0", name="performance_duration_check"),
+        trigram_index("performance", "title"),
+        trigram_index("performance", "genre"),
+    )
 
 
 class ConcertProgram(Base):
     __tablename__ = "concert_program"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     date: Mapped[Date] = mapped_column(Date, nullable=False)
     venue_id: Mapped[int | None] = mapped_column(
@@ -90,11 +164,32 @@ class ConcertProgram(Base):
     number_of_performances: Mapped[int] = mapped_column(Integer, nullable=False)
     time: Mapped[str | None] = mapped_column("time", String(20), nullable=True)
 
+    # Read-only: links are written through the relation routes, and the
+    # foreign keys cascade deletes without the ORM loading these collections.
+    venue: Mapped[Venue | None] = relationship(viewonly=True)
+    performances: Mapped[list[Performance]] = relationship(
+        secondary="agency.performance_concert_program",
+        order_by="Performance.id",
+        viewonly=True,
+    )
+    organizers: Mapped[list[Organizer]] = relationship(
+        secondary="agency.organizer_concert_program",
+        order_by="Organizer.id",
+        viewonly=True,
+    )
+
+    __table_args__ = (
+        trigram_index("concert_program", "title"),
+        trigram_index("concert_program", "address"),
+        Index("ix_concert_program_venue_id", "venue_id"),
+        Index("ix_concert_program_date", "date"),
+    )
+
 
 class Ticket(Base):
     __tablename__ = "ticket"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     ticket_number: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
     price: Mapped[int] = mapped_column(Integer, nullable=False)
     client_id: Mapped[int | None] = mapped_column(
@@ -112,13 +207,29 @@ class Ticket(Base):
     date: Mapped[Date] = mapped_column(Date, nullable=False)
     time: Mapped[str | None] = mapped_column("time", String(20), nullable=True)
 
-    __table_args__ = (CheckConstraint("price >= 0", name="ticket_price_check"),)
+    __table_args__ = (
+        CheckConstraint("price >= 0", name="ticket_price_check"),
+        trigram_index("ticket", "ticket_number"),
+        trigram_index("ticket", "place"),
+        trigram_index("ticket", "address"),
+        Index("ix_ticket_client_id", "client_id"),
+        Index("ix_ticket_concert_program_id", "concert_program_id"),
+        Index("ix_ticket_date", "date"),
+        # A seat can be sold once per program; tickets without a seat are free.
+        Index(
+            "ix_ticket_concert_program_place",
+            "concert_program_id",
+            "place",
+            unique=True,
+            postgresql_where=text("place IS NOT NULL"),
+        ),
+    )
 
 
 class Test(Base):
     __tablename__ = "test"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     a: Mapped[int | None] = mapped_column(Integer, nullable=True)
     b: Mapped[str | None] = mapped_column(Text, nullable=True)
 
@@ -137,6 +248,9 @@ class ArtistPerformance(Base):
         primary_key=True,
     )
 
+    # The composite primary key only serves lookups by its leading column.
+    __table_args__ = (Index("ix_artist_performance_performance_id", "performance_id"),)
+
 
 class OrganizerConcertProgram(Base):
     __tablename__ = "organizer_concert_program"
@@ -152,6 +266,11 @@ class OrganizerConcertProgram(Base):
         primary_key=True,
     )
 
+    # The composite primary key only serves lookups by its leading column.
+    __table_args__ = (
+        Index("ix_organizer_concert_program_concert_program_id", "concert_program_id"),
+    )
+
 
 class PerformanceConcertProgram(Base):
     __tablename__ = "performance_concert_program"
@@ -166,3 +285,77 @@ class PerformanceConcertProgram(Base):
         ForeignKey("agency.concert_program.id", onupdate="CASCADE", ondelete="CASCADE"),
         primary_key=True,
     )
+
+    # The composite primary key only serves lookups by its leading column.
+    __table_args__ = (
+        Index("ix_performance_concert_program_concert_program_id", "concert_program_id"),
+    )
+
+
+class TicketSales(Base):
+    """Tickets sold per concert program, kept by statement triggers on ticket.
+
+    The triggers (migration 7) also reject statements that take a program
+    past its venue's capacity; see :mod:`app.tickets`. There is no foreign
+    key so that program id changes cascading to tickets move the count too.
+    ``version`` counts the statements that wrote the program's tickets; the
+    ticket ETags sum it instead of bumping a shared ``table_version`` row
+    (migration 9), so sales of different programs never wait on each other.
+    """
+
+    __tablename__ = "ticket_sales"
+
+    concert_program_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sold: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+
+
+class TableVersion(Base):
+    """Per-table write counter behind the ETags of list and item responses.
+
+    Statement-level triggers (migration 5) bump a table's row on every
+    INSERT, UPDATE, DELETE or TRUNCATE, whether it comes from the CRUD routes
+    or from raw SQL. Tables never written to have no row (version 0). The
+    ``ticket`` row only counts truncates and tickets without a program; other
+    ticket writes are counted per program in :class:`TicketSales`.
+    """
+
+    __tablename__ = "table_version"
+
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class ReportRefresh(Base):
+    """When each reporting materialized view was last refreshed (app.reports)."""
+
+    __tablename__ = "report_refresh"
+
+    view_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+# Columns folded into each table's full-text search document, backed by an
+# expression GIN index (PostgreSQL only).
+SEARCH_COLUMNS: dict[type[Base], tuple[Any, ...]] = {
+    Artist: (Artist.full_name, Artist.genre),
+    Client: (Client.full_name, Client.email, Client.phone),
+    ConcertProgram: (ConcertProgram.title, ConcertProgram.address),
+    Organizer: (Organizer.full_name, Organizer.position),
+    Performance: (Performance.title, Performance.genre),
+    Venue: (Venue.name, Venue.address, Venue.type),
+}
+
+for _model, _columns in SEARCH_COLUMNS.items():
+    _model.__table__.append_constraint(
+        Index(
+            f"ix_{_model.__tablename__}_search",
+            search_document(*_columns),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql")
+    )
@@ -0,0 +1,51 @@
+"""Helpers for streaming query results through PostgreSQL ``COPY``."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+
+def compile_statement(stmt: Select, engine: Engine) -> tuple[str, dict[str, Any]]:
+    """Compile a select into driver SQL plus its bound parameters."""
+    compiled = stmt.compile(dialect=engine.dialect)
+    return str(compiled), dict(compiled.params)
+
+
+def iter_copy_csv(engine: Engine, stmt: Select) -> Iterator[bytes]:
+    """Yield CSV chunks (with a header row) produced by ``COPY ... TO STDOUT``.
+
+    Rows never become Python objects: psycopg hands back the raw buffers the
+    server sends. The pooled connection is held only while the generator runs;
+    if the consumer stops early, the connection is discarded instead of being
+    returned mid-COPY.
+    """
+    sql, params = compile_statement(stmt, engine)
+    copy_sql = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    raw = engine.raw_connection()
+    finished = False
+    try:
+        with raw.driver_connection.cursor() as cursor:
+            with cursor.copy(copy_sql, params) as copy:
+                for chunk in copy:
+                    yield bytes(chunk)
+        raw.driver_connection.rollback()
+        finished = True
+    finally:
+        if not finished:
+            raw.invalidate()
+        raw.close()
+
+
+def copy_csv_to_file(engine: Engine, stmt: Select, path: Path) -> int:
+    """Write the ``COPY`` CSV output of ``stmt`` to ``path``; return bytes written."""
+    written = 0
+    with path.open("wb") as target:
+        for chunk in iter_copy_csv(engine, stmt):
+            target.write(chunk)
+            written += len(chunk)
+    return written
@@ -0,0 +1,181 @@
+"""Server-side cursors that page through ad-hoc SQL results across requests.
+
+An open cursor pins one pooled connection holding a read-only transaction
+with a named (server-side) cursor, so only the rows of the page being
+fetched ever leave the database. Cursors belong to the worker process that
+opened them, whose pid prefixes the cursor id: with several workers, the
+requests paging a cursor must be routed to that worker (sticky sessions),
+and other workers recognise and refuse them. Cursors left idle for longer
+than the timeout are closed, which returns their connection to the pool.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy.engine import Connection, CursorResult
+
+
+class CursorLimitError(RuntimeError):
+    """Raised when every cursor slot of this worker is in use."""
+
+
+def cursor_owner(cursor_id: str) -> int | None:
+    """Return the pid of the worker that opened ``cursor_id``, if it names one."""
+    pid, _, _ = cursor_id.partition("-")
+    return int(pid) if pid.isdigit() else None
+
+
+@dataclass
+class QueryCursor:
+    id: str
+    connection: Connection
+    result: CursorResult
+    last_used: float = field(default_factory=time.monotonic)
+    # One row read ahead of the last page, so exhaustion is known exactly.
+    pending: list[dict[str, Any]] = field(default_factory=list)
+    # Held while the cursor is used; whoever holds it may close it.
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    closed: bool = False
+
+    def fetch(self, size: int) -> tuple[list[dict[str, Any]], bool]:
+        """Return up to ``size`` rows and whether more rows follow."""
+        wanted = size + 1 - len(self.pending)
+        fetched = self.result.mappings().fetchmany(wanted)
+        rows = self.pending + [dict(row) for row in fetched]
+        self.pending = rows[size:]
+        self.last_used = time.monotonic()
+        return rows[:size], bool(self.pending)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.result.close()
+        finally:
+            # Closing the connection rolls the transaction back and returns it
+            # to the pool.
+            self.connection.close()
+
+
+class CursorRegistry:
+    """The open cursors of this worker, capped at ``max_open``."""
+
+    def __init__(self, max_open: int, idle_timeout: float) -> None:
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self._cursors: dict[str, QueryCursor] = {}
+        self._lock = threading.Lock()
+
+    def has_room(self) -> bool:
+        self.expire()
+        with self._lock:
+            return len(self._cursors) < self.max_open
+
+    def open(
+        self, connection: Connection, result: CursorResult, size: int, keep: bool = True
+    ) -> tuple[list[dict[str, Any]], str | None, bool]:
+        """Fetch the first page of ``result`` and keep it open if rows remain.
+
+        Returns the rows, the cursor id (``None`` when nothing was kept open)
+        and whether rows were left unread. With ``keep=False`` the result is
+        always closed after the first page. Takes ownership of ``connection``.
+        """
+        cursor = QueryCursor(f"{os.getpid()}-{uuid.uuid4().hex}", connection, result)
+        try:
+            rows, more = cursor.fetch(size)
+        except BaseException:
+            cursor.close()
+            raise
+        if not (more and keep):
+            cursor.close()
+            return rows, None, more
+        with self._lock:
+            if len(self._cursors) >= self.max_open:
+                cursor.close()
+                raise CursorLimitError(f"At most {self.max_open} open cursors")
+            self._cursors[cursor.id] = cursor
+        return rows, cursor.id, more
+
+    def owns(self, cursor_id: str) -> bool:
+        """Whether ``cursor_id`` was opened by this worker process."""
+        return cursor_owner(cursor_id) == os.getpid()
+
+    def fetch(self, cursor_id: str, size: int) -> tuple[list[dict[str, Any]], bool]:
+        """Return the next page of a cursor; it is closed once exhausted.
+
+        Raises ``KeyError`` for unknown or expired cursors.
+        """
+        with self._lock:
+            cursor = self._cursors[cursor_id]
+            # Marked in use before the registry lock is released, so the
+            # expiry sweep cannot pick it in between.
+            cursor.last_used = time.monotonic()
+        with cursor.lock:
+            if cursor.closed:
+                # Closed by a DELETE while this fetch waited for the lock.
+                raise KeyError(cursor_id)
+            try:
+                rows, more = cursor.fetch(size)
+            except BaseException:
+                self._discard(cursor)
+                raise
+            if not more:
+                self._discard(cursor)
+        return rows, more
+
+    def close(self, cursor_id: str) -> bool:
+        with self._lock:
+            cursor = self._cursors.pop(cursor_id, None)
+        if cursor is None:
+            return False
+        # Waits for a fetch in progress instead of closing under it.
+        with cursor.lock:
+            cursor.close()
+        return True
+
+    def _discard(self, cursor: QueryCursor) -> None:
+        """Unregister and close ``cursor``; the caller holds its lock."""
+        with self._lock:
+            if self._cursors.get(cursor.id) is cursor:
+                del self._cursors[cursor.id]
+        cursor.close()
+
+    def expire(self) -> int:
+        """Close cursors idle for longer than ``idle_timeout``."""
+        deadline = time.monotonic() - self.idle_timeout
+        expired: list[QueryCursor] = []
+        with self._lock:
+            for cursor_id, cursor in list(self._cursors.items()):
+                # A cursor being fetched from is in use, however old.
+                if cursor.last_used < deadline and cursor.lock.acquire(blocking=False):
+                    del self._cursors[cursor_id]
+                    expired.append(cursor)
+        for cursor in expired:
+            try:
+                cursor.close()
+            finally:
+                cursor.lock.release()
+        return len(expired)
+
+    def close_all(self) -> None:
+        with self._lock:
+            cursors = list(self._cursors.values())
+            self._cursors.clear()
+        for cursor in cursors:
+            with cursor.lock:
+                cursor.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "open": len(self._cursors),
+                "max_open": self.max_open,
+                "idle_timeout_s": self.idle_timeout,
+            }
@@ -0,0 +1,193 @@
+"""Bulk link and unlink of association-table pairs in one statement each."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import models
+from .schemas import BulkRowError, RelationBulkResult
+
+# Pairs are sent as two integer arrays and unnested server side, so one
+# prepared statement serves every batch size.
+_INPUT = """
+input AS (
+    SELECT *
+    FROM unnest(CAST(:left_ids AS integer[]), CAST(:right_ids AS integer[]))
+        WITH ORDINALITY AS i(left_id, right_id, ordinal)
+)"""
+
+LINK_SQL = """
+WITH {input},
+inserted AS (
+    INSERT INTO {table} ({left_column}, {right_column})
+    SELECT i.left_id, i.right_id
+    FROM input i
+    JOIN {left_table} l ON l.id = i.left_id
+    JOIN {right_table} r ON r.id = i.right_id
+    ON CONFLICT DO NOTHING
+    RETURNING {left_column} AS left_id, {right_column} AS right_id
+)
+SELECT i.ordinal,
+       l.id IS NOT NULL AS left_found,
+       r.id IS NOT NULL AS right_found,
+       n.left_id IS NOT NULL AS inserted
+FROM input i
+LEFT JOIN {left_table} l ON l.id = i.left_id
+LEFT JOIN {right_table} r ON r.id = i.right_id
+LEFT JOIN inserted n ON n.left_id = i.left_id AND n.right_id = i.right_id
+ORDER BY i.ordinal
+"""
+
+UNLINK_SQL = """
+WITH {input},
+deleted AS (
+    DELETE FROM {table} t
+    USING input i
+    WHERE t.{left_column} = i.left_id AND t.{right_column} = i.right_id
+    RETURNING t.{left_column} AS left_id, t.{right_column} AS right_id
+)
+SELECT i.ordinal, d.left_id IS NOT NULL AS deleted
+FROM input i
+LEFT JOIN deleted d ON d.left_id = i.left_id AND d.right_id = i.right_id
+ORDER BY i.ordinal
+"""
+
+
+@dataclass(frozen=True)
+class Relation:
+    """An association table and the two tables its pairs point to."""
+
+    model: type[models.Base]
+    left: type[models.Base]
+    left_column: str
+    right: type[models.Base]
+    right_column: str
+
+    def render(self, template: str) -> str:
+        return template.format(
+            input=_INPUT.strip(),
+            table=self.model.__table__.fullname,
+            left_column=self.left_column,
+            right_column=self.right_column,
+            left_table=self.left.__table__.fullname,
+            right_table=self.right.__table__.fullname,
+        )
+
+
+RELATIONS: dict[str, Relation] = {
+    "artist_performance": Relation(
+        models.ArtistPerformance,
+        models.Artist,
+        "artist_id",
+        models.Performance,
+        "performance_id",
+    ),
+    "organizer_concert_program": Relation(
+        models.OrganizerConcertProgram,
+        models.Organizer,
+        "organizer_id",
+        models.ConcertProgram,
+        "concert_program_id",
+    ),
+    "performance_concert_program": Relation(
+        models.PerformanceConcertProgram,
+        models.Performance,
+        "performance_id",
+        models.ConcertProgram,
+        "concert_program_id",
+    ),
+}
+
+
+def _unique_pairs(
+    pairs: list[tuple[int, int, int]],
+) -> tuple[list[tuple[int, int, int]], dict[int, list[int]]]:
+    """Drop repeated pairs, keeping the first.
+
+    Also returns the indexes of the repeats of each kept pair, keyed by the
+    kept pair's index, so that they can share its outcome.
+    """
+    first: dict[tuple[int, int], int] = {}
+    unique = []
+    repeats: dict[int, list[int]] = {}
+    for index, left_id, right_id in pairs:
+        kept = first.setdefault((left_id, right_id), index)
+        if kept == index:
+            unique.append((index, left_id, right_id))
+        else:
+            repeats.setdefault(kept, []).append(index)
+    return unique, repeats
+
+
+def _execute(
+    session: Session, sql: str, pairs: list[tuple[int, int, int]]
+) -> list[dict[str, Any]]:
+    params = {
+        "left_ids": [left_id for _, left_id, _ in pairs],
+        "right_ids": [right_id for _, _, right_id in pairs],
+    }
+    return [dict(row) for row in session.execute(text(sql), params).mappings()]
+
+
+def link_pairs(
+    session: Session, relation: Relation, pairs: list[tuple[int, int, int]]
+) -> RelationBulkResult:
+    """Insert ``(index, left_id, right_id)`` pairs with one statement.
+
+    Pairs already linked (or repeated in the batch) are skipped; pairs whose
+    entities do not exist are reported as per-pair errors instead of failing
+    the batch with a foreign key violation, and so are their repeats. The
+    caller commits.
+    """
+    unique, repeats = _unique_pairs(pairs)
+    result = RelationBulkResult()
+    if not unique:
+        return result
+    for (index, left_id, right_id), row in zip(
+        unique, _execute(session, relation.render(LINK_SQL), unique)
+    ):
+        repeated = repeats.get(index, [])
+        if not row["left_found"]:
+            detail = f"{relation.left.__name__} with id={left_id} not found"
+        elif not row["right_found"]:
+            detail = f"{relation.right.__name__} with id={right_id} not found"
+        else:
+            if row["inserted"]:
+                result.inserted += 1
+            else:
+                result.skipped += 1
+            # Linked by (or already linked before) the first occurrence.
+            result.skipped += len(repeated)
+            continue
+        result.errors += [
+            BulkRowError(index=error_index, detail=detail)
+            for error_index in (index, *repeated)
+        ]
+    return result
+
+
+def unlink_pairs(
+    session: Session, relation: Relation, pairs: list[tuple[int, int, int]]
+) -> RelationBulkResult:
+    """Delete ``(index, left_id, right_id)`` pairs with one ``DELETE ... USING``.
+
+    Pairs that were not linked count as skipped. The caller commits.
+    """
+    unique, repeats = _unique_pairs(pairs)
+    result = RelationBulkResult()
+    if not unique:
+        return result
+    for (index, _, _), row in zip(
+        unique, _execute(session, relation.render(UNLINK_SQL), unique)
+    ):
+        if row["deleted"]:
+            result.deleted += 1
+        else:
+            result.skipped += 1
+        # Already unlinked by the first occurrence, or never linked.
+        result.skipped += len(repeats.get(index, []))
+    return result
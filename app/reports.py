@@ -0,0 +1,117 @@
+"""Reporting materialized views and their refresh bookkeeping.
+
+Each report is a materialized view over the ticket, concert program, venue
+and link tables, defined and created by migration 6 (``app.migrations``);
+changing one takes a new migration. Reads are plain selects from the
+view; ``REFRESH MATERIALIZED VIEW CONCURRENTLY`` rebuilds it without
+blocking those reads (it relies on the view's unique index). The time of
+every refresh is kept in ``agency.report_refresh`` so responses can state
+how old their data is.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+SCHEMA = "agency"
+REFRESH_TABLE = f"{SCHEMA}.report_refresh"
+# Arbitrary key for pg_try_advisory_xact_lock, paired with the report name.
+LOCK_KEY = 7_310_252
+
+
+@dataclass(frozen=True)
+class Report:
+    name: str
+    description: str
+    key: str = "concert_program_id"
+
+    @property
+    def view(self) -> str:
+        return f"{SCHEMA}.report_{self.name}"
+
+
+REPORTS: dict[str, Report] = {
+    report.name: report
+    for report in (
+        Report("program_revenue", "Tickets sold and revenue per concert program"),
+        Report(
+            "sell_through", "Tickets sold against venue capacity per concert program"
+        ),
+        Report(
+            "program_lineup", "Performances, artists and organizers per concert program"
+        ),
+    )
+}
+
+
+def refresh_report(
+    engine: Engine, report: Report, max_age: float | None = None
+) -> float | None:
+    """Refresh ``report`` concurrently and return the time it took in seconds.
+
+    Returns ``None`` without refreshing when another process is already
+    refreshing the same report, or when ``max_age`` is given and the data is
+    younger than that (so several workers on one schedule refresh once).
+    """
+    with engine.begin() as connection:
+        locked = connection.scalar(
+            text("SELECT pg_try_advisory_xact_lock(:key, hashtext(:name))"),
+            {"key": LOCK_KEY, "name": report.name},
+        )
+        if not locked:
+            return None
+        if max_age is not None:
+            fresh = connection.scalar(
+                text(
+                    f"SELECT refreshed_at > now() - make_interval(secs => :age) "
+                    f"FROM {REFRESH_TABLE} WHERE view_name = :name"
+                ),
+                {"age": max_age, "name": report.name},
+            )
+            if fresh:
+                return None
+        started = time.perf_counter()
+        connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {report.view}"))
+        duration = time.perf_counter() - started
+        connection.execute(
+            text(
+                f"INSERT INTO {REFRESH_TABLE} (view_name, refreshed_at, duration_ms) "
+                "VALUES (:name, now(), :duration_ms) "
+                "ON CONFLICT (view_name) DO UPDATE "
+                "SET refreshed_at = excluded.refreshed_at, "
+                "duration_ms = excluded.duration_ms"
+            ),
+            {"name": report.name, "duration_ms": round(duration * 1000, 3)},
+        )
+    return duration
+
+
+def report_freshness(connection: Connection, report: Report) -> dict[str, Any]:
+    """Return when ``report`` was last refreshed and its age in seconds."""
+    row = connection.execute(
+        text(
+            "SELECT refreshed_at, "
+            "extract(epoch FROM now() - refreshed_at)::float8 AS age_seconds, "
+            f"duration_ms FROM {REFRESH_TABLE} WHERE view_name = :name"
+        ),
+        {"name": report.name},
+    ).mappings().first()
+    if row is None:
+        return {"refreshed_at": None, "age_seconds": None, "refresh_ms": None}
+    return {
+        "refreshed_at": row["refreshed_at"],
+        "age_seconds": round(row["age_seconds"], 3),
+        "refresh_ms": row["duration_ms"],
+    }
+
+
+def read_report(connection: Connection, report: Report) -> list[dict[str, Any]]:
+    result = connection.execute(
+        text(f"SELECT * FROM {report.view} ORDER BY date, {report.key}")
+    )
+    return [dict(row) for row in result.mappings()]
@@ -0,0 +1,285 @@
+"""Handle-addressed storage for query results used by the CSV export."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+# Pointer file content of a client whose latest result was cleared.
+NO_RESULT = "-"
+# Rows encoded to estimate the size of a result stored without one.
+SIZE_SAMPLE_ROWS = 16
+
+
+@dataclass(frozen=True)
+class StoredResult:
+    """Columns of a stored result plus a lazy iterator over its rows."""
+
+    columns: list[str]
+    rows: Iterator[dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class _Entry:
+    columns: list[str]
+    rows: list[dict[str, Any]]
+    size: int
+    client_key: str
+
+
+class ResultStore:
+    """Bounded result store shared by every worker through a spill directory.
+
+    Storing a result never touches the disk: it is kept in a per-process LRU
+    whose total size is capped by ``memory_limit`` bytes. A background
+    :meth:`flush` (every ``flush_interval`` seconds) writes to
+    ``<directory>/<handle>.jsonl`` only what must outlive that LRU or be seen
+    by other workers: each client's latest result, together with the
+    client's pointer file, and results too large for memory. On disk every
+    client keeps its ``max_per_client`` most recent results, so other
+    clients' reads never evict them; files older than ``ttl`` seconds are
+    swept at most every ``sweep_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl: float,
+        memory_limit: int,
+        max_per_client: int,
+        flush_interval: float = 1.0,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.memory_limit = memory_limit
+        self.max_per_client = max_per_client
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._memory_size = 0
+        # Results waiting for the next flush, and the latest handle of every
+        # client whose pointer file is out of date (None: clear it).
+        self._pending: dict[str, _Entry] = {}
+        self._dirty_clients: dict[str, tuple[str | None, float]] = {}
+        # Latest handle of each client served by this worker, with its time.
+        self._latest: dict[str, tuple[str | None, float]] = {}
+        # Handles written to disk by this worker, per client, oldest first.
+        self._written: dict[str, deque[str]] = {}
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    # Public API ----------------------------------------------------------
+    def put(
+        self,
+        columns: list[str],
+        rows: list[dict[str, Any]],
+        client_key: str,
+        size: int | None = None,
+    ) -> str:
+        """Store a result as the latest of ``client_key`` and return its handle.
+
+        ``size`` is the result's approximate size in bytes (e.g. the length
+        of the response body); if omitted, it is extrapolated from the first
+        few rows rather than encoding them all on the request thread.
+        """
+        handle = uuid.uuid4().hex
+        if size is None:
+            size = self._estimate_size(columns, rows)
+        entry = _Entry(columns, rows, size, client_key)
+        now = time.time()
+        with self._lock:
+            if size <= self.memory_limit:
+                self._remember_in_memory(handle, entry)
+            previous = self._dirty_clients.get(client_key, (None, 0.0))[0]
+            superseded = self._pending.get(previous) if previous else None
+            # Superseded before it was flushed: it only needs writing if it is
+            # too large for memory.
+            if superseded is not None and superseded.size <= self.memory_limit:
+                del self._pending[previous]
+            self._pending[handle] = entry
+            self._dirty_clients[client_key] = (handle, now)
+            self._latest[client_key] = (handle, now)
+        return handle
+
+    def get(self, handle: str, wait: bool = False) -> StoredResult | None:
+        """Return a stored result, or ``None`` if it expired or never existed.
+
+        With ``wait``, a handle found nowhere is looked up again after one
+        flush interval, in case another worker has yet to write it.
+        """
+        if not _is_valid_handle(handle):
+            return None
+        stored = self._get(handle)
+        if stored is None and wait:
+            time.sleep(self.flush_interval)
+            stored = self._get(handle)
+        return stored
+
+    def clear_latest(self, client_key: str) -> None:
+        """Forget the most recent result recorded for ``client_key``."""
+        now = time.time()
+        with self._lock:
+            self._dirty_clients[client_key] = (None, now)
+            self._latest[client_key] = (None, now)
+
+    def latest(self, client_key: str) -> str | None:
+        """Return the most recent handle recorded for ``client_key``.
+
+        The newer of this worker's own record and the pointer file flushed by
+        any worker wins.
+        """
+        with self._lock:
+            local = self._latest.get(client_key)
+        try:
+            content = self._pointer_path(client_key).read_text(encoding="utf-8")
+            handle, stamp = content.split()
+            shared = (None if handle == NO_RESULT else handle, float(stamp))
+        except (FileNotFoundError, ValueError):
+            shared = None
+        candidates = [record for record in (local, shared) if record is not None]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda record: record[1])[0]
+
+    def flush(self) -> None:
+        """Write pending results and pointers, enforce caps, sweep expired files."""
+        with self._flush_lock:
+            with self._lock:
+                pending = dict(self._pending)
+                clients, self._dirty_clients = self._dirty_clients, {}
+            if not pending and not clients and not self._sweep_due():
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for handle, entry in pending.items():
+                self._write_lines(
+                    self._path(handle), self._encode(entry.columns, entry.rows)
+                )
+                # Still served from pending until the file is in place.
+                with self._lock:
+                    self._pending.pop(handle, None)
+                written = self._written.setdefault(entry.client_key, deque())
+                written.append(handle)
+                while len(written) > self.max_per_client:
+                    self._delete(written.popleft())
+            for client_key, (handle, stamp) in clients.items():
+                self._write_lines(
+                    self._pointer_path(client_key), [f"{handle or NO_RESULT} {stamp}"]
+                )
+            if self._sweep_due():
+                self._sweep()
+
+    # Internals -----------------------------------------------------------
+    def _get(self, handle: str) -> StoredResult | None:
+        with self._lock:
+            entry = self._memory.get(handle) or self._pending.get(handle)
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+        if entry is not None:
+            return StoredResult(columns=entry.columns, rows=iter(entry.rows))
+        path = self._path(handle)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                self._delete(handle)
+                return None
+            os.utime(path)
+            return self._read(path)
+        except FileNotFoundError:
+            return None
+
+    def _path(self, handle: str) -> Path:
+        return self.directory / f"{handle}.jsonl"
+
+    def _pointer_path(self, client_key: str) -> Path:
+        digest = hashlib.sha1(client_key.encode("utf-8")).hexdigest()
+        return self.directory / f"client-{digest}.last"
+
+    def _write_lines(self, path: Path, lines: Iterator[str] | list[str]) -> None:
+        tmp_fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(tmp_fd, "w", encoding="utf-8") as target:
+            target.writelines(lines)
+        os.replace(tmp_name, path)
+
+    @classmethod
+    def _estimate_size(cls, columns: list[str], rows: list[dict[str, Any]]) -> int:
+        sample = rows[:SIZE_SAMPLE_ROWS]
+        header, *lines = cls._encode(columns, sample)
+        if not lines:
+            return len(header)
+        return len(header) + sum(map(len, lines)) * len(rows) // len(lines)
+
+    @staticmethod
+    def _encode(columns: list[str], rows: list[dict[str, Any]]) -> Iterator[str]:
+        yield json.dumps(columns) + "\n"
+        for row in rows:
+            yield json.dumps(row, default=str) + "\n"
+
+    @staticmethod
+    def _read(path: Path) -> StoredResult | None:
+        stream = path.open("r", encoding="utf-8")
+        header = stream.readline()
+        if not header:
+            stream.close()
+            return None
+
+        def rows() -> Iterator[dict[str, Any]]:
+            with stream:
+                for line in stream:
+                    yield json.loads(line)
+
+        return StoredResult(columns=json.loads(header), rows=rows())
+
+    def _remember_in_memory(self, handle: str, entry: _Entry) -> None:
+        # Called with self._lock held.
+        self._memory[handle] = entry
+        self._memory_size += entry.size
+        while self._memory_size > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= evicted.size
+
+    def _forget(self, handle: str) -> None:
+        with self._lock:
+            entry = self._memory.pop(handle, None)
+            if entry is not None:
+                self._memory_size -= entry.size
+
+    def _delete(self, handle: str) -> None:
+        self._forget(handle)
+        self._path(handle).unlink(missing_ok=True)
+
+    def _sweep_due(self) -> bool:
+        return time.monotonic() - self._last_sweep >= self.sweep_interval
+
+    def _sweep(self) -> None:
+        """Drop result and pointer files older than ``ttl``."""
+        self._last_sweep = time.monotonic()
+        now = time.time()
+        with self._lock:
+            for client_key, (_, stamp) in list(self._latest.items()):
+                if now - stamp > self.ttl:
+                    del self._latest[client_key]
+                    self._written.pop(client_key, None)
+        for path in self.directory.iterdir():
+            try:
+                expired = now - path.stat().st_mtime > self.ttl
+            except FileNotFoundError:
+                continue
+            if expired:
+                self._forget(path.stem)
+                path.unlink(missing_ok=True)
+
+
+def _is_valid_handle(handle: str) -> bool:
+    return len(handle) == 32 and all(char in "0123456789abcdef" for char in handle)
@@ -1,5 +1,7 @@
-from datetime import date
-from pydantic import BaseModel, ConfigDict, Field
+from datetime import date, datetime
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field, computed_field, model_validator
 
 
 class ArtistBase(BaseModel):
@@ -177,12 +179,60 @@ class VenueRead(VenueBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PerformanceWithArtists(PerformanceRead):
+    artists: list[ArtistRead] = Field(default_factory=list)
+
+
+class ConcertProgramFull(ConcertProgramRead):
+    """A concert program with its venue, organizers and performances."""
+
+    venue: VenueRead | None = None
+    organizers: list[OrganizerRead] = Field(default_factory=list)
+    performances: list[PerformanceWithArtists] = Field(default_factory=list)
+
+
+class TicketIssueRequest(BaseModel):
+    """Issue ``quantity`` unseated tickets, or one ticket per entry of ``places``."""
+
+    concert_program_id: int
+    price: int = Field(ge=0)
+    quantity: int | None = Field(default=None, gt=0)
+    places: list[str] | None = Field(default=None, min_length=1)
+    client_id: int | None = None
+
+    @model_validator(mode="after")
+    def _check_quantity(self) -> "TicketIssueRequest":
+        if self.places is None and self.quantity is None:
+            raise ValueError("Give either quantity or places")
+        if self.places is not None:
+            if self.quantity not in (None, len(self.places)):
+                raise ValueError("quantity must match the number of places")
+            if len(set(self.places)) != len(self.places):
+                raise ValueError("places must not repeat")
+            self.quantity = len(self.places)
+        return self
+
+
+class TicketIssueResult(BaseModel):
+    concert_program_id: int
+    tickets: list[TicketRead]
+    # Seats left after this sale; None when the venue has no capacity.
+    remaining: int | None
+
+
 class SQLQuery(BaseModel):
     query: str
+    # Run in a read-write transaction; queries are read-only by default.
+    allow_writes: bool = False
+    timeout: float | None = Field(default=None, gt=0, description="Seconds")
+    max_rows: int | None = Field(default=None, gt=0)
+    # Lets another request cancel the query; generated when omitted.
+    query_id: str | None = Field(default=None, pattern=r"^[A-Za-z0-9_-]{1,40}$")
 
 
 class CSVRequest(BaseModel):
     filename: str | None = None
+    handle: str | None = None
 
 
 class BackupRequest(BaseModel):
@@ -194,6 +244,68 @@ class RestoreRequest(BackupRequest):
     pass
 
 
+class BulkRowError(BaseModel):
+    index: int
+    detail: Any
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    ids: list[int]
+    errors: list[BulkRowError]
+
+
+class RelationBulkResult(BaseModel):
+    inserted: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    errors: list[BulkRowError] = Field(default_factory=list)
+
+    @computed_field
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+class ImportRejectedRow(BaseModel):
+    line: int
+    detail: Any
+
+
+class ImportReport(BaseModel):
+    received: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    rejected: int = 0
+    rejected_rows: list[ImportRejectedRow] = Field(default_factory=list)
+
+
+class SearchHit(BaseModel):
+    table: str
+    id: int
+    label: str
+    rank: float
+
+
+class ReportInfo(BaseModel):
+    report: str
+    description: str
+    refreshed_at: datetime | None
+    age_seconds: float | None
+    refresh_ms: float | None
+
+
+class ReportData(ReportInfo):
+    rows: list[dict[str, Any]]
+
+
+class ReportRefreshResult(BaseModel):
+    report: str
+    refreshed: bool
+    duration_ms: float | None = None
+
+
 class OperationStatus(BaseModel):
     message: str
     path: str | None = None
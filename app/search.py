@@ -0,0 +1,58 @@
+"""Cross-table full-text search over the indexed search documents."""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from sqlalchemy import Float, desc, func, literal, literal_column, select, union_all
+from sqlalchemy.sql import Select
+
+from . import models
+
+# Column shown as the human-readable label of a hit, per searchable table.
+SEARCH_LABELS: dict[str, Any] = {
+    "artist": models.Artist.full_name,
+    "client": models.Client.full_name,
+    "concert_program": models.ConcertProgram.title,
+    "organizer": models.Organizer.full_name,
+    "performance": models.Performance.title,
+    "venue": models.Venue.name,
+}
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(query: str) -> str | None:
+    """Turn free text into a ``to_tsquery`` string matching every term by prefix.
+
+    Only word characters survive, so user input cannot inject tsquery syntax.
+    """
+    terms = _TERM_RE.findall(query.lower())
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def build_search(tsquery: str, tables: list[str], limit: int) -> Select:
+    """Union one ranked, index-backed select per table and keep the best hits."""
+    query = func.to_tsquery(literal_column("'simple'::regconfig"), tsquery)
+    branches = []
+    for table in tables:
+        label = SEARCH_LABELS[table]
+        model = label.class_
+        document = models.search_document(*models.SEARCH_COLUMNS[model])
+        rank = func.ts_rank(document, query, type_=Float)
+        branches.append(
+            select(
+                literal(table).label("table"),
+                model.id.label("id"),
+                label.label("label"),
+                rank.label("rank"),
+            )
+            .where(document.op("@@")(query))
+            .order_by(desc(rank))
+            .limit(limit)
+        )
+    hits = union_all(*branches).subquery()
+    return select(hits).order_by(desc(hits.c.rank), hits.c.table, hits.c.id).limit(limit)
@@ -0,0 +1,188 @@
+"""Per-request SQL timing and the slow-query log.
+
+Cursor execution hooks on every engine add each statement's duration and
+row count to the :class:`RequestTiming` of the HTTP request being served
+(set by :class:`ServerTimingMiddleware`, which reports the totals in a
+``Server-Timing`` header). Statements slower than ``SLOW_QUERY_THRESHOLD``
+seconds are logged to the ``app.slow_sql`` logger; a sampled share of the
+slow single ``SELECT`` statements is re-run under ``EXPLAIN (ANALYZE,
+BUFFERS)`` in a background thread, inside a read-only transaction that is
+rolled back, and the plan is logged too.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+slow_log = logging.getLogger("app.slow_sql")
+
+# Marks the connection used to capture plans, so its statements are neither
+# timed nor sampled again.
+EXPLAIN_OPTION = "slow_query_explain"
+EXPLAINABLE = re.compile(r"^\s*select\b[^;]*;?\s*$", re.IGNORECASE)
+# Longest statement text written to the log.
+MAX_LOGGED_STATEMENT = 2000
+
+
+@dataclass
+class RequestTiming:
+    """SQL totals of one request; mutated by the cursor hooks."""
+
+    path: str = ""
+    statements: int = 0
+    rows: int = 0
+    db_seconds: float = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.3f};'
+            f'desc="{self.statements} statements, {self.rows} rows", '
+            f"app;dur={total_seconds * 1000:.3f}"
+        )
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> RequestTiming | None:
+    """Return the timing of the request being served, if any."""
+    return _current.get()
+
+
+class SlowQueryLog:
+    """Logs slow statements and captures sampled plans one at a time."""
+
+    def __init__(
+        self, threshold: float, explain_rate: float, explain_engine: Callable[[], Engine]
+    ) -> None:
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self._explain_engine = explain_engine
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._explaining = threading.Semaphore(1)
+
+    def record(
+        self,
+        statement: str,
+        parameters: Any,
+        seconds: float,
+        rows: int,
+        path: str,
+        executemany: bool = False,
+    ) -> None:
+        slow_log.warning(
+            "slow query %.1f ms, %d rows%s: %s",
+            seconds * 1000,
+            rows,
+            f" ({path})" if path else "",
+            statement[:MAX_LOGGED_STATEMENT],
+        )
+        if (
+            self.explain_rate > 0
+            and EXPLAINABLE.match(statement)
+            and not executemany
+            and random.random() < self.explain_rate
+            # Skip the sample rather than queue it while a plan is running.
+            and self._explaining.acquire(blocking=False)
+        ):
+            self._executor.submit(self._explain, statement, parameters, seconds)
+
+    def _explain(self, statement: str, parameters: Any, seconds: float) -> None:
+        try:
+            engine = self._explain_engine()
+            with engine.connect() as connection:
+                connection = connection.execution_options(**{EXPLAIN_OPTION: True})
+                connection.execute(text("SET TRANSACTION READ ONLY"))
+                # Give the re-run the time the original took, with headroom.
+                connection.execute(
+                    text("SELECT set_config('statement_timeout', :timeout, true)"),
+                    {"timeout": str(round(seconds * 2000) + 1000)},
+                )
+                plan = connection.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters or None
+                ).scalars()
+                slow_log.warning(
+                    "plan of slow query %s:\n%s",
+                    statement[:200],
+                    "\n".join(plan),
+                )
+                connection.rollback()
+        except SQLAlchemyError as exc:
+            slow_log.info("could not capture plan of slow query: %s", exc)
+        finally:
+            self._explaining.release()
+
+
+def instrument_engine(engine: Engine, slow_queries: SlowQueryLog) -> None:
+    """Time every statement ``engine`` executes."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._sql_timing_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context.execution_options.get(EXPLAIN_OPTION):
+            return
+        seconds = time.perf_counter() - context._sql_timing_started
+        rows = max(cursor.rowcount, 0)
+        timing = _current.get()
+        if timing is not None:
+            timing.statements += 1
+            timing.rows += rows
+            timing.db_seconds += seconds
+        if 0 < slow_queries.threshold <= seconds:
+            path = timing.path if timing is not None else ""
+            slow_queries.record(statement, parameters, seconds, rows, path, executemany)
+
+
+class ServerTimingMiddleware:
+    """Collect SQL totals per request and send them as ``Server-Timing``.
+
+    The header is sent with the response start, so statements run while a
+    streaming body is produced are not part of it. With ``send_header=False``
+    the totals are only collected, for the request metrics.
+    """
+
+    def __init__(self, app: ASGIApp, send_header: bool = True) -> None:
+        self.app = app
+        self.send_header = send_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming(path=scope.get("path", ""))
+        started = time.perf_counter()
+        token = _current.set(timing)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.send_header:
+                header = timing.server_timing(time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", ()),
+                        (b"server-timing", header.encode("latin-1")),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
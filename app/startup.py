@@ -0,0 +1,27 @@
+"""Per-worker startup timing report."""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any
+
+
+class StartupReport:
+    """Durations (in seconds) of the phases a worker goes through to serve."""
+
+    def __init__(self) -> None:
+        self._phases: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self._phases[phase] = seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            phases = {name: round(seconds * 1000, 3) for name, seconds in self._phases.items()}
+        return {"pid": os.getpid(), "phases_ms": phases}
+
+
+startup_report = StartupReport()
@@ -0,0 +1,86 @@
+"""Ticket issuance: many seats for one concert program in one statement.
+
+Overselling is prevented by the database rather than by this module:
+triggers created by migration 7 keep ``agency.ticket_sales`` (tickets sold
+per program) up to date and reject any ticket statement that takes a program
+past its venue's capacity, and a partial unique index rejects a seat sold
+twice. Concurrent sales of the same program serialize only on that
+program's counter row, so sales of different programs never wait on each
+other, and tickets written through the generic routes or raw SQL are held
+to the same rules.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+SCHEMA = "agency"
+TICKET_NUMBER_SEQUENCE = f"{SCHEMA}.ticket_number_seq"
+TICKET_NUMBER_PREFIX = "TK-"
+# Names reported by the database for the two overselling guards.
+CAPACITY_CONSTRAINT = "ticket_capacity_check"
+SEAT_INDEX = "ix_ticket_concert_program_place"
+
+# Ticket numbers come from a sequence, so issuing never reads existing
+# tickets. The program supplies the date, time and address of every ticket.
+# Seats are inserted in sorted order, so two sales wanting overlapping seats
+# wait on each other instead of deadlocking.
+ISSUE_SQL = f"""
+INSERT INTO {SCHEMA}.ticket
+    (ticket_number, price, client_id, concert_program_id, place, address, date, time)
+SELECT '{TICKET_NUMBER_PREFIX}'
+           || lpad(nextval('{TICKET_NUMBER_SEQUENCE}')::text, 10, '0'),
+       :price, :client_id, cp.id, s.place, cp.address, cp.date, cp.time
+FROM {SCHEMA}.concert_program cp
+CROSS JOIN generate_series(1, :quantity) AS g(ordinal)
+LEFT JOIN unnest(CAST(:places AS text[])) WITH ORDINALITY AS s(place, ordinal)
+       ON s.ordinal = g.ordinal
+WHERE cp.id = :program_id
+ORDER BY g.ordinal
+RETURNING id, ticket_number, price, client_id, concert_program_id, place,
+          address, date, time
+"""
+
+REMAINING_SQL = f"""
+SELECT v.capacity - coalesce(s.sold, 0)
+FROM {SCHEMA}.concert_program cp
+LEFT JOIN {SCHEMA}.venue v ON v.id = cp.venue_id
+LEFT JOIN {SCHEMA}.ticket_sales s ON s.concert_program_id = cp.id
+WHERE cp.id = :program_id
+"""
+
+
+def issue_tickets(
+    session: Session,
+    program_id: int,
+    quantity: int,
+    price: int,
+    client_id: int | None = None,
+    places: list[str] | None = None,
+) -> tuple[list[dict], int | None]:
+    """Insert ``quantity`` tickets for ``program_id`` and return them.
+
+    Also returns the seats left afterwards (``None`` when the venue has no
+    capacity). No rows means the program does not exist. Capacity and seat
+    violations surface as ``IntegrityError`` naming :data:`CAPACITY_CONSTRAINT`
+    or :data:`SEAT_INDEX`. The caller commits.
+    """
+    rows = [
+        dict(row)
+        for row in session.execute(
+            text(ISSUE_SQL),
+            {
+                "program_id": program_id,
+                "quantity": quantity,
+                "price": price,
+                "client_id": client_id,
+                "places": sorted(places or []),
+            },
+        ).mappings()
+    ]
+    if not rows:
+        return rows, None
+    rows.sort(key=lambda row: row["id"])
+    remaining = session.scalar(text(REMAINING_SQL), {"program_id": program_id})
+    return rows, remaining
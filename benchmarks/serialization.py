@@ -0,0 +1,80 @@
+"""Per-row cost of the read serialization path, before and after.
+
+Runs without a database: rows are synthesized in memory, so only the Python
+side of ``list_items`` is measured.
+
+    python -m benchmarks.serialization [rows] [repeat]
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+from datetime import date
+
+from pydantic import TypeAdapter
+
+from app import models, schemas
+
+
+def _make_rows(count: int) -> list[dict[str, object]]:
+    return [
+        {
+            "id": index,
+            "ticket_number": f"T{index:08d}",
+            "price": 1000 + index % 5000,
+            "client_id": index % 1000,
+            "concert_program_id": index % 100,
+            "place": f"{index % 30} ряд {index % 40} место",
+            "address": "Минск, пр-т Победителей, 111",
+            "date": date(2026, 11, 12),
+            "time": "18:00",
+        }
+        for index in range(1, count + 1)
+    ]
+
+
+def legacy_path(
+    records: list[models.Ticket], response_adapter: TypeAdapter
+) -> bytes:
+    """ORM objects validated for the export cache, the handler and FastAPI.
+
+    FastAPI builds the response model's adapter once per route, so it is
+    passed in rather than timed.
+    """
+    read_schema = schemas.TicketRead
+    cached = [read_schema.model_validate(record).model_dump() for record in records]
+    del cached
+    handler_result = [read_schema.model_validate(record) for record in records]
+    prepared = [item.model_dump() for item in handler_result]
+    return response_adapter.dump_json(response_adapter.validate_python(prepared))
+
+
+def single_pass(rows: list[dict[str, object]], adapter: TypeAdapter) -> bytes:
+    """Column rows validated once by a precompiled adapter and dumped to JSON."""
+    return adapter.dump_json(adapter.validate_python(rows))
+
+
+def main(argv: list[str]) -> None:
+    count = int(argv[1]) if len(argv) > 1 else 10_000
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+    rows = _make_rows(count)
+    records = [models.Ticket(**row) for row in rows]
+    adapter = TypeAdapter(list[schemas.TicketRead])
+
+    results = {
+        "legacy (3x validate)": min(
+            timeit.repeat(
+                lambda: legacy_path(records, adapter), number=1, repeat=repeat
+            )
+        ),
+        "single pass": min(
+            timeit.repeat(lambda: single_pass(rows, adapter), number=1, repeat=repeat)
+        ),
+    }
+    for label, seconds in results.items():
+        print(f"{label:<22} {seconds * 1e6 / count:8.2f} us/row  ({count} rows)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
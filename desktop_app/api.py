@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
 import requests
@@ -12,6 +17,10 @@ class APIError(RuntimeError):
     """Raised when the backend API returns an error."""
 
 
+# Number of GET responses kept for conditional requests (If-None-Match).
+ETAG_CACHE_SIZE = 128
+
+
 @dataclass(frozen=True)
 class APIClient:
     """Thin wrapper around requests.Session for the Agency API."""
@@ -20,18 +29,62 @@ class APIClient:
     timeout: float = 15.0
 
     def __post_init__(self) -> None:
-        object.__setattr__(self, "_session", requests.Session())
+        session = requests.Session()
+        session.headers["X-Client-Id"] = uuid.uuid4().hex
+        object.__setattr__(self, "_session", session)
         object.__setattr__(self, "_base", self.base_url.rstrip("/"))
+        object.__setattr__(self, "_last_handle", None)
+        # Re-runs the last read when its result is not stored server side
+        # (paged, or replayed from the ETag cache); see save_last_query.
+        object.__setattr__(self, "_refresh_last", None)
+        # (table, filter params) of rows shown page by page; Save Last Query
+        # exports all of them.
+        object.__setattr__(self, "_last_export", None)
+        object.__setattr__(self, "_etag_cache", OrderedDict())
+        # The client is shared by the UI and worker threads.
+        object.__setattr__(self, "_etag_lock", threading.Lock())
 
-    def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+    def _send(
+        self,
+        method: str,
+        path: str,
+        revalidate: bool = True,
+        remember: bool = True,
+        **kwargs: Any,
+    ) -> requests.Response:
         url = f"{self._base}{path}"
         if "timeout" not in kwargs:
             kwargs["timeout"] = self.timeout
+        cache_key = cached = None
+        if method == "GET" and not kwargs.get("stream"):
+            prepared = requests.Request(method, url, params=kwargs.get("params")).prepare()
+            cache_key = prepared.url
+            with self._etag_lock:
+                cached = self._etag_cache.get(cache_key) if revalidate else None
+            if cached is not None:
+                kwargs["headers"] = {
+                    **(kwargs.get("headers") or {}),
+                    "If-None-Match": cached.headers["ETag"],
+                }
         try:
             response = self._session.request(method, url, **kwargs)
         except requests.RequestException as exc:
             raise APIError(f"Network error: {exc}") from exc
 
+        replayed = response.status_code == 304 and cached is not None
+        if replayed:
+            # Unchanged on the server: reuse the body received earlier.
+            with self._etag_lock:
+                if cache_key in self._etag_cache:
+                    self._etag_cache.move_to_end(cache_key)
+            response = cached
+        elif cache_key is not None and response.ok and "ETag" in response.headers:
+            with self._etag_lock:
+                self._etag_cache[cache_key] = response
+                self._etag_cache.move_to_end(cache_key)
+                while len(self._etag_cache) > ETAG_CACHE_SIZE:
+                    self._etag_cache.popitem(last=False)
+
         if response.status_code >= 400:
             detail: str
             try:
@@ -46,7 +99,29 @@ class APIClient:
             except ValueError:
                 detail = response.text.strip() or response.reason
             raise APIError(f"{response.status_code}: {detail}")
+        handle = response.headers.get("X-Result-Handle") if remember else None
+        if handle and replayed:
+            # The cached handle may have expired; fetch a fresh one on export.
+            params = kwargs.get("params")
+            self._set_last_handle(
+                None, lambda: self._send("GET", path, revalidate=False, params=params)
+            )
+        elif handle:
+            self._set_last_handle(handle)
+        return response
+
+    def _set_last_handle(
+        self,
+        handle: str | None,
+        refresh: Callable[[], Any] | None = None,
+        export: tuple[str, dict[str, Any] | None] | None = None,
+    ) -> None:
+        object.__setattr__(self, "_last_handle", handle)
+        object.__setattr__(self, "_refresh_last", refresh)
+        object.__setattr__(self, "_last_export", export)
 
+    @staticmethod
+    def _decode(response: requests.Response) -> Any:
         if response.headers.get("content-type", "").startswith("application/json"):
             try:
                 return response.json()
@@ -54,15 +129,102 @@ class APIClient:
                 raise APIError("Invalid JSON response") from exc
         return response.text
 
+    def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        return self._decode(self._send(method, path, **kwargs))
+
     # CRUD operations -----------------------------------------------------
-    def list_items(self, table: str) -> list[dict[str, Any]]:
-        data = self._request("GET", f"/api/{table}")
-        return list(data) if isinstance(data, list) else []
+    def list_items(
+        self,
+        table: str,
+        limit: int | None = None,
+        after_id: int | None = None,
+        fields: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        rows, _ = self.list_page(table, limit=limit, after_id=after_id, fields=fields)
+        return rows
+
+    def list_page(
+        self,
+        table: str,
+        limit: int | None = None,
+        after_id: int | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        """Return one keyset page of rows and the cursor of the next page, if any.
+
+        ``fields`` limits the returned columns (the id is always included).
+        Only a first page becomes the last query for :meth:`save_last_query`;
+        when more pages follow, the whole table is exported instead.
+        """
+        params: dict[str, Any] = {}
+        if limit is not None:
+            params["limit"] = limit
+        if after_id is not None:
+            params["after_id"] = after_id
+        if fields:
+            params["fields"] = ",".join(fields)
+        response = self._send(
+            "GET", f"/api/{table}", remember=after_id is None, params=params or None
+        )
+        data = self._decode(response)
+        rows = list(data) if isinstance(data, list) else []
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor and after_id is None:
+            self._set_last_handle(None, export=(table, None))
+        return rows, int(cursor) if cursor else None
+
+    def fetch_item(
+        self, table: str, item_id: int, fields: list[str] | None = None
+    ) -> dict[str, Any]:
+        params = {"fields": ",".join(fields)} if fields else None
+        data = self._request("GET", f"/api/{table}/{item_id}", params=params)
+        return dict(data) if isinstance(data, dict) else {}
 
-    def fetch_item(self, table: str, item_id: int) -> dict[str, Any]:
-        data = self._request("GET", f"/api/{table}/{item_id}")
+    def fetch_program_full(self, program_id: int) -> dict[str, Any]:
+        """Return a concert program with its venue, organizers, performances
+        and their artists in one call."""
+        data = self._request("GET", f"/api/concert_program/{program_id}/full")
         return dict(data) if isinstance(data, dict) else {}
 
+    def list_programs_full(
+        self, limit: int | None = None, after_id: int | None = None
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        """Return one keyset page of nested concert programs and the next cursor."""
+        params: dict[str, Any] = {}
+        if limit is not None:
+            params["limit"] = limit
+        if after_id is not None:
+            params["after_id"] = after_id
+        # Continuation pages keep the first page as the last query.
+        response = self._send(
+            "GET",
+            "/api/concert_program/full",
+            remember=after_id is None,
+            params=params or None,
+        )
+        data = self._decode(response)
+        rows = list(data) if isinstance(data, list) else []
+        cursor = response.headers.get("X-Next-Cursor")
+        return rows, int(cursor) if cursor else None
+
+    def issue_tickets(
+        self,
+        program_id: int,
+        price: int,
+        quantity: int | None = None,
+        places: list[str] | None = None,
+        client_id: int | None = None,
+    ) -> dict[str, Any]:
+        """Sell ``quantity`` tickets (or one per place) for a concert program."""
+        payload: dict[str, Any] = {"concert_program_id": program_id, "price": price}
+        if quantity is not None:
+            payload["quantity"] = quantity
+        if places is not None:
+            payload["places"] = places
+        if client_id is not None:
+            payload["client_id"] = client_id
+        return self._request("POST", "/api/ticket/issue", json=payload)
+
     def create_item(self, table: str, payload: dict[str, Any]) -> dict[str, Any]:
         return self._request("POST", f"/api/{table}", json=payload)
 
@@ -72,20 +234,180 @@ class APIClient:
     def delete_item(self, table: str, item_id: int) -> None:
         self._request("DELETE", f"/api/{table}/{item_id}")
 
-    def filter_table(self, table: str, column: str, query: str) -> list[dict[str, Any]]:
-        params = {"column": column, "query": query}
-        data = self._request("GET", f"/api/db/filter/{table}", params=params)
+    def bulk_create(self, table: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
+        return self._request("POST", f"/api/{table}/bulk", json=rows)
+
+    def bulk_update(self, table: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
+        return self._request("PUT", f"/api/{table}/bulk", json=rows)
+
+    def bulk_delete(self, table: str, item_ids: list[int]) -> dict[str, Any]:
+        return self._request("DELETE", f"/api/{table}/bulk", json=item_ids)
+
+    def import_file(self, table: str, source: str | Path) -> dict[str, Any]:
+        """Upload a CSV or NDJSON (``.ndjson``/``.jsonl``) file into ``table``."""
+        path = Path(source)
+        content_type = (
+            "application/x-ndjson" if path.suffix in {".ndjson", ".jsonl"} else "text/csv"
+        )
+        with path.open("rb") as body:
+            return self._request(
+                "POST",
+                f"/api/{table}/import",
+                data=body,
+                headers={"Content-Type": content_type},
+            )
+
+    def filter_table(
+        self,
+        table: str,
+        column: str,
+        query: str,
+        prefix: bool = False,
+        fields: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        rows, _ = self.filter_page(table, column, query, prefix=prefix, fields=fields)
+        return rows
+
+    def filter_page(
+        self,
+        table: str,
+        column: str,
+        query: str,
+        prefix: bool = False,
+        fields: list[str] | None = None,
+        limit: int | None = None,
+        after_id: int | None = None,
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        """Return one keyset page of matching rows and the next cursor, if any.
+
+        Like :meth:`list_page`, a first page followed by more makes
+        :meth:`save_last_query` export every match.
+        """
+        params: dict[str, Any] = {"column": column, "query": query}
+        if prefix:
+            params["prefix"] = "true"
+        if fields:
+            params["fields"] = ",".join(fields)
+        if limit is not None:
+            params["limit"] = limit
+        if after_id is not None:
+            params["after_id"] = after_id
+        response = self._send(
+            "GET", f"/api/db/filter/{table}", remember=after_id is None, params=params
+        )
+        data = self._decode(response)
+        rows = list(data) if isinstance(data, list) else []
+        cursor = response.headers.get("X-Next-Cursor")
+        # The export matches by substring only, so prefix results keep the
+        # first page as the last query.
+        if cursor and after_id is None and not prefix:
+            export = (table, {"column": column, "query": query})
+            self._set_last_handle(None, export=export)
+        return rows, int(cursor) if cursor else None
+
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        data = self._request("GET", "/api/search", params={"q": query, "limit": limit})
         return list(data) if isinstance(data, list) else []
 
     # Database utilities --------------------------------------------------
-    def execute_sql(self, query: str) -> dict[str, Any]:
-        payload = {"query": query}
-        return self._request("POST", "/api/db/query", json=payload)
+    def execute_sql(
+        self, query: str, allow_writes: bool = False, query_id: str | None = None
+    ) -> dict[str, Any]:
+        """Run ad-hoc SQL; it is read-only unless ``allow_writes`` is set.
+
+        Passing ``query_id`` lets :meth:`cancel_query` stop it from another
+        thread while this call waits.
+        """
+        payload: dict[str, Any] = {"query": query, "allow_writes": allow_writes}
+        if query_id is not None:
+            payload["query_id"] = query_id
+        data = self._request("POST", "/api/db/query", json=payload)
+        self._set_last_handle(data.get("handle"))
+        return data
+
+    def cancel_query(self, query_id: str) -> dict[str, Any]:
+        return self._request("POST", f"/api/db/query/{query_id}/cancel")
+
+    def open_cursor(
+        self, query: str, page_size: int | None = None, query_id: str | None = None
+    ) -> dict[str, Any]:
+        """Run a read-only query and return its first page.
+
+        ``cursor_id`` in the response is set while more rows remain; pass it
+        to :meth:`fetch_cursor` and :meth:`close_cursor`.
+        """
+        payload: dict[str, Any] = {"query": query}
+        if page_size is not None:
+            payload["max_rows"] = page_size
+        if query_id is not None:
+            payload["query_id"] = query_id
+        data = self._request("POST", "/api/db/query/cursor", json=payload)
+        if data.get("handle") or "rows" not in data:
+            self._set_last_handle(data.get("handle"))
+        else:
+            # Paged or cut short: only the first page is known server side,
+            # so the export runs the query again through /api/db/query.
+            self._set_last_handle(None, lambda: self.execute_sql(query))
+        return data
+
+    def fetch_cursor(
+        self, cursor_id: str, limit: int | None = None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Return the next page of a cursor and the id to continue with, if any."""
+        params = {"limit": limit} if limit is not None else None
+        data = self._request("GET", f"/api/db/query/cursor/{cursor_id}", params=params)
+        return list(data.get("rows", [])), data.get("cursor_id")
+
+    def close_cursor(self, cursor_id: str) -> None:
+        self._request("DELETE", f"/api/db/query/cursor/{cursor_id}")
 
     def save_last_query(self, filename: str | None = None) -> dict[str, Any]:
-        payload = {"filename": filename} if filename else {}
+        payload: dict[str, Any] = {"filename": filename} if filename else {}
+        if self._last_export is not None:
+            # Streamed to a file server side, so every page is included.
+            table, params = self._last_export
+            return self._request(
+                "POST", f"/api/db/export/{table}", params=params, json=payload or None
+            )
+        if self._refresh_last is not None:
+            # Store the last result anew before exporting it.
+            self._refresh_last()
+        if self._last_handle:
+            payload["handle"] = self._last_handle
         return self._request("POST", "/api/db/csv", json=payload or None)
 
+    def download_export(
+        self,
+        table: str,
+        destination: str | Path,
+        column: str | None = None,
+        query: str | None = None,
+        progress: Callable[[int], None] | None = None,
+        chunk_size: int = 64 * 1024,
+    ) -> int:
+        """Stream a server-side CSV export of ``table`` into ``destination``.
+
+        ``progress`` is called with the number of bytes received so far after
+        every chunk. Returns the total number of bytes written.
+        """
+        params = {"column": column, "query": query} if column and query else None
+        response = self._send(
+            "GET", f"/api/db/export/{table}", params=params, stream=True
+        )
+        received = 0
+        try:
+            with Path(destination).open("wb") as target:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    target.write(chunk)
+                    received += len(chunk)
+                    if progress is not None:
+                        progress(received)
+        except requests.RequestException as exc:
+            raise APIError(f"Network error: {exc}") from exc
+        finally:
+            response.close()
+        return received
+
     def create_backup(self, path: str, password: str) -> dict[str, Any]:
         payload = {"path": path, "superuser_password": password}
         return self._request("POST", "/api/db/backup", json=payload)
@@ -122,6 +444,14 @@ class APIClient:
             "POST", f"/api/performance/{performance_id}/concert_program/{program_id}/add"
         )
 
+    def bulk_link(self, relation: str, pairs: list[dict[str, int]]) -> dict[str, Any]:
+        """Link many pairs at once, e.g. ``relation="artist_performance"`` with
+        ``[{"artist_id": 1, "performance_id": 2}, ...]``."""
+        return self._request("POST", f"/api/{relation}/bulk", json=pairs)
+
+    def bulk_unlink(self, relation: str, pairs: list[dict[str, int]]) -> dict[str, Any]:
+        return self._request("DELETE", f"/api/{relation}/bulk", json=pairs)
+
     def unlink_performance_program(self, performance_id: int, program_id: int) -> dict[str, Any]:
         return self._request(
             "POST", f"/api/performance/{performance_id}/concert_program/{program_id}/remove"
@@ -6,13 +6,16 @@ import os
 import tkinter as tk
 from datetime import date
 from functools import partial
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
 from typing import Any, Iterable
 
 from .api import APIClient, APIError
 from .definitions import FieldDefinition, TABLE_DEFINITIONS, TABLE_ORDER, TableDefinition
 from .forms import FormDialog, SQLDialog
 
+# Rows fetched per request when paging through an ad-hoc query result.
+SQL_PAGE_SIZE = 500
+
 
 class AgencyDesktopApp:
     """Main desktop GUI implementation."""
@@ -27,6 +30,17 @@ class AgencyDesktopApp:
         self.active_table = tk.StringVar(value=TABLE_ORDER[0])
         self.current_rows: list[dict[str, Any]] = []
         self.row_cache: dict[str, dict[str, Any]] = {}
+        # Server-side cursor of the ad-hoc query shown in the tree, if it has
+        # more rows; they are fetched as the user scrolls to the bottom.
+        self.custom_cursor: str | None = None
+        self.custom_columns: list[str] = []
+        # Keyset cursor (X-Next-Cursor) of the table shown in the tree, if it
+        # has more pages; they are fetched the same way.
+        self.table_cursor: int | None = None
+        # (column, query) of the filter applied to the table, if any.
+        self.table_filter: tuple[str, str] | None = None
+        self.table_columns: list[str] = []
+        self._fetching_page = False
 
         self.status_var = tk.StringVar(value="Ready")
 
@@ -113,6 +127,11 @@ class AgencyDesktopApp:
             command=self.save_last_query,
             underline=0,
         )
+        operations_menu.add_command(
+            label="Export Table to CSV…",
+            command=self.export_table_csv,
+            underline=1,
+        )
         operations_menu.add_separator()
         operations_menu.add_command(
             label="Create Backup…",
@@ -173,7 +192,8 @@ class AgencyDesktopApp:
 
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         vsb.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.vsb = vsb
 
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
         hsb.grid(row=1, column=0, sticky="ew")
@@ -219,16 +239,22 @@ class AgencyDesktopApp:
         del event
         self.load_table_data(self.active_table.get())
 
-    def load_table_data(self, table: str, rows: list[dict[str, Any]] | None = None) -> None:
+    def load_table_data(
+        self, table: str, filter_by: tuple[str, str] | None = None
+    ) -> None:
+        self._close_custom_cursor()
+        self.table_cursor = None
+        self.table_filter = filter_by
         definition = TABLE_DEFINITIONS[table]
         try:
-            data = rows if rows is not None else self.client.list_items(table)
+            data, next_cursor = self._fetch_table_page(table, None)
         except APIError as exc:
+            self.table_filter = None
             messagebox.showerror("API Error", str(exc), parent=self.root)
             self.set_status(f"Failed to fetch data for {definition.label}.")
             return
 
-        self.current_rows = data
+        self.current_rows = list(data)
         self.row_cache = {}
 
         columns = self._resolve_columns(definition, data)
@@ -242,15 +268,54 @@ class AgencyDesktopApp:
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        for row in data:
+        self.table_columns = columns
+        self._append_table_rows(definition, data)
+        self.table_cursor = next_cursor
+
+        record_count = len(data)
+        suffix = " Scroll for more." if next_cursor is not None else ""
+        self.set_status(f"{definition.label}: {record_count} record(s) loaded.{suffix}")
+
+    def _append_table_rows(
+        self, definition: TableDefinition, rows: list[dict[str, Any]]
+    ) -> None:
+        for row in rows:
             item_id = str(row.get(definition.primary_key, ""))
-            values = [self._format_value(row.get(col)) for col in columns]
+            values = [self._format_value(row.get(col)) for col in self.table_columns]
             self.tree.insert("", "end", iid=item_id, values=values)
             if item_id:
                 self.row_cache[item_id] = row
 
-        record_count = len(data)
-        self.set_status(f"{definition.label}: {record_count} record(s) loaded.")
+    def _load_next_table_page(self) -> None:
+        table = self.active_table.get()
+        definition = TABLE_DEFINITIONS[table]
+        try:
+            if self.table_cursor is None:
+                return
+            try:
+                rows, self.table_cursor = self._fetch_table_page(
+                    table, self.table_cursor
+                )
+            except APIError as exc:
+                self.table_cursor = None
+                self.set_status(f"Could not load more records: {exc}")
+                return
+            self.current_rows.extend(rows)
+            self._append_table_rows(definition, rows)
+            suffix = " Scroll for more." if self.table_cursor is not None else ""
+            self.set_status(
+                f"{definition.label}: {len(self.current_rows)} record(s) loaded.{suffix}"
+            )
+        finally:
+            self._fetching_page = False
+
+    def _fetch_table_page(
+        self, table: str, after_id: int | None
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        if self.table_filter is None:
+            return self.client.list_page(table, after_id=after_id)
+        column, query = self.table_filter
+        return self.client.filter_page(table, column, query, after_id=after_id)
 
     def _resolve_columns(
         self, definition: TableDefinition, rows: Iterable[dict[str, Any]]
@@ -430,13 +495,10 @@ class AgencyDesktopApp:
             return
         column = values["column"]
         query = values["query"]
-        try:
-            rows = self.client.filter_table(table, column, query)
-        except APIError as exc:
-            messagebox.showerror("API Error", str(exc), parent=self.root)
-            return
-        self.load_table_data(table, rows=rows)
-        self.set_status(f"Filtered {definition.label} by {column!r}.")
+        self.load_table_data(table, filter_by=(column, query))
+        if self.table_filter is not None:
+            suffix = " Scroll for more." if self.table_cursor is not None else ""
+            self.set_status(f"Filtered {definition.label} by {column!r}.{suffix}")
 
     def run_special_query(self, event: tk.Event | None = None) -> None:
         del event
@@ -444,15 +506,29 @@ class AgencyDesktopApp:
         query = dialog.show()
         if query is None:
             return
+        self._close_custom_cursor()
+        self.table_cursor = None
         try:
-            response = self.client.execute_sql(query)
+            if dialog.allow_writes:
+                response = self.client.execute_sql(query, allow_writes=True)
+            else:
+                response = self.client.open_cursor(query, page_size=SQL_PAGE_SIZE)
         except APIError as exc:
             messagebox.showerror("API Error", str(exc), parent=self.root)
             return
         if "rows" in response:
             rows = response["rows"]
-            self.load_custom_rows(rows)
-            self.set_status("SQL query executed successfully.")
+            self.load_custom_rows(rows, cursor_id=response.get("cursor_id"))
+            if self.custom_cursor is not None:
+                self.set_status(
+                    f"SQL query executed. {len(rows)} rows loaded; scroll for more."
+                )
+            elif response.get("truncated"):
+                self.set_status(
+                    f"SQL query executed. Showing the first {len(rows)} rows only."
+                )
+            else:
+                self.set_status("SQL query executed successfully.")
         else:
             rowcount = response.get("rowcount", 0)
             messagebox.showinfo(
@@ -462,7 +538,10 @@ class AgencyDesktopApp:
             )
             self.set_status("SQL query executed successfully.")
 
-    def load_custom_rows(self, rows: list[dict[str, Any]]) -> None:
+    def load_custom_rows(
+        self, rows: list[dict[str, Any]], cursor_id: str | None = None
+    ) -> None:
+        """Show ad-hoc query rows; ``cursor_id`` pages in the rest on scroll."""
         if not rows:
             self.tree.config(columns=())
             for item in self.tree.get_children():
@@ -478,12 +557,61 @@ class AgencyDesktopApp:
         for item in self.tree.get_children():
             self.tree.delete(item)
         self.row_cache = {}
-        for index, row in enumerate(rows, start=1):
+        self.custom_columns = columns
+        self._append_custom_rows(rows)
+        self.custom_cursor = cursor_id
+
+    def _append_custom_rows(self, rows: list[dict[str, Any]]) -> None:
+        start = len(self.row_cache) + 1
+        for index, row in enumerate(rows, start=start):
             item_id = str(index)
-            values = [self._format_value(row.get(col)) for col in columns]
+            values = [self._format_value(row.get(col)) for col in self.custom_columns]
             self.tree.insert("", "end", iid=item_id, values=values)
             self.row_cache[item_id] = row
 
+    def _on_tree_scroll(self, first: str, last: str) -> None:
+        self.vsb.set(first, last)
+        if self._fetching_page or float(last) < 0.98:
+            return
+        if self.custom_cursor is not None:
+            load_next_page = self._load_next_custom_page
+        elif self.table_cursor is not None:
+            load_next_page = self._load_next_table_page
+        else:
+            return
+        self._fetching_page = True
+        # Fetch outside the scroll callback, which fires while inserting.
+        self.root.after_idle(load_next_page)
+
+    def _load_next_custom_page(self) -> None:
+        cursor_id = self.custom_cursor
+        try:
+            if cursor_id is None:
+                return
+            try:
+                rows, self.custom_cursor = self.client.fetch_cursor(
+                    cursor_id, limit=SQL_PAGE_SIZE
+                )
+            except APIError as exc:
+                self.custom_cursor = None
+                self.set_status(f"Could not load more rows: {exc}")
+                return
+            self._append_custom_rows(rows)
+            suffix = " Scroll for more." if self.custom_cursor else ""
+            self.set_status(f"SQL query: {len(self.row_cache)} rows loaded.{suffix}")
+        finally:
+            self._fetching_page = False
+
+    def _close_custom_cursor(self) -> None:
+        """Release the server-side cursor of the previous ad-hoc query."""
+        cursor_id, self.custom_cursor = self.custom_cursor, None
+        if cursor_id is None:
+            return
+        try:
+            self.client.close_cursor(cursor_id)
+        except APIError:
+            pass  # Already expired on the server.
+
     def save_last_query(self, event: tk.Event | None = None) -> None:
         del event
         dialog = FormDialog(
@@ -507,6 +635,32 @@ class AgencyDesktopApp:
         messagebox.showinfo("Save Last Query", message, parent=self.root)
         self.set_status(message)
 
+    def export_table_csv(self) -> None:
+        table = self.active_table.get()
+        definition = TABLE_DEFINITIONS[table]
+        destination = filedialog.asksaveasfilename(
+            parent=self.root,
+            title=f"Export {definition.label}",
+            defaultextension=".csv",
+            initialfile=f"{table}.csv",
+            filetypes=(("CSV files", "*.csv"), ("All files", "*.*")),
+        )
+        if not destination:
+            return
+
+        def report(received: int) -> None:
+            self.set_status(f"Exporting {definition.label}: {received // 1024} KiB…")
+            self.root.update_idletasks()
+
+        try:
+            received = self.client.download_export(table, destination, progress=report)
+        except (APIError, OSError) as exc:
+            messagebox.showerror("Export Error", str(exc), parent=self.root)
+            return
+        message = f"{definition.label} exported ({received // 1024} KiB) to {destination}"
+        messagebox.showinfo("Export Table", message, parent=self.root)
+        self.set_status(message)
+
     def create_backup(self, event: tk.Event | None = None) -> None:
         del event
         dialog = FormDialog(
@@ -647,6 +801,7 @@ class AgencyDesktopApp:
     # ------------------------------------------------------------------
     def exit_app(self, event: tk.Event | None = None) -> None:
         del event
+        self._close_custom_cursor()
         self.root.quit()
 
 
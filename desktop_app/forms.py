@@ -120,6 +120,8 @@ class SQLDialog(tk.Toplevel):
         self.title(title)
         self.geometry("600x400")
         self.result: str | None = None
+        self.allow_writes = False
+        self._allow_writes_var = tk.BooleanVar(value=False)
 
         self.columnconfigure(0, weight=1)
         self.rowconfigure(0, weight=1)
@@ -133,12 +135,17 @@ class SQLDialog(tk.Toplevel):
             self.text.insert("1.0", initial)
 
         button_frame = ttk.Frame(self)
-        button_frame.grid(row=2, column=0, sticky="e", padx=10, pady=(0, 10))
+        button_frame.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 10))
+        button_frame.columnconfigure(0, weight=1)
 
+        writes_check = ttk.Checkbutton(
+            button_frame, text="Allow writes", variable=self._allow_writes_var
+        )
+        writes_check.grid(row=0, column=0, sticky="w")
         submit_btn = ttk.Button(button_frame, text="Execute", command=self._on_submit)
-        submit_btn.grid(row=0, column=0, padx=(0, 6))
+        submit_btn.grid(row=0, column=1, padx=(0, 6))
         cancel_btn = ttk.Button(button_frame, text="Cancel", command=self._on_cancel)
-        cancel_btn.grid(row=0, column=1)
+        cancel_btn.grid(row=0, column=2)
 
         self.protocol("WM_DELETE_WINDOW", self._on_cancel)
         self.bind("<Control-Return>", self._on_submit)
@@ -155,6 +162,7 @@ class SQLDialog(tk.Toplevel):
             self.bell()
             return
         self.result = query
+        self.allow_writes = self._allow_writes_var.get()
         self.destroy()
 
     def _on_cancel(self, event: tk.Event | None = None) -> None:
@@ -0,0 +1,58 @@
+"""Fixtures for tests that run against a real PostgreSQL database.
+
+Point ``DATABASE_URL`` at a disposable database before running pytest: its
+``agency`` schema is migrated once and truncated before every test. Without
+a PostgreSQL ``DATABASE_URL`` the database tests are skipped.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+
+@pytest.fixture(scope="session")
+def engine() -> Engine:
+    if not DATABASE_URL.startswith("postgresql"):
+        pytest.skip("DATABASE_URL does not point to a PostgreSQL test database")
+    from app import migrations
+    from app.database import get_engine
+
+    migrations.upgrade(get_engine(), log=lambda message: None)
+    return get_engine()
+
+
+@pytest.fixture
+def clean_db(engine: Engine) -> Engine:
+    from app.database import Base
+
+    tables = ", ".join(table.fullname for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    return engine
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request: pytest.FixtureRequest, clean_db: Engine) -> Iterator[TestClient]:
+    """A client of the app serving routes in sync or DB_ASYNC mode.
+
+    Routes pick their mode when they are declared, so the app module is
+    re-imported with the setting switched.
+    """
+    from app import main
+
+    main.settings.db_async = request.param == "async"
+    try:
+        application = importlib.reload(main).create_app()
+        with TestClient(application) as test_client:
+            yield test_client
+    finally:
+        main.settings.db_async = False
@@ -0,0 +1,122 @@
+"""CRUD, list, filter and relation routes, served in sync and DB_ASYNC mode."""
+
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+
+ARTIST = {"full_name": "Nina Simone", "genre": "jazz"}
+PERFORMANCE = {"title": "Late set", "genre": "jazz", "number_of_artists": 1}
+
+
+def _create(client: TestClient, table: str, payload: dict) -> dict:
+    response = client.post(f"/api/{table}", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_crud_round_trip(client: TestClient) -> None:
+    artist = _create(client, "artist", ARTIST)
+
+    response = client.get(f"/api/artist/{artist['id']}")
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Nina Simone"
+    assert response.headers["X-Result-Handle"]
+
+    response = client.put(
+        f"/api/artist/{artist['id']}", json={**ARTIST, "genre": "soul"}
+    )
+    assert response.status_code == 200
+    assert response.json()["genre"] == "soul"
+
+    assert client.delete(f"/api/artist/{artist['id']}").status_code == 204
+    assert client.get(f"/api/artist/{artist['id']}").status_code == 404
+
+
+def test_list_pages_and_revalidates(client: TestClient) -> None:
+    for number in range(5):
+        _create(client, "artist", {**ARTIST, "full_name": f"Artist {number}"})
+
+    first = client.get("/api/artist", params={"limit": 3})
+    assert [row["full_name"] for row in first.json()] == [
+        "Artist 0",
+        "Artist 1",
+        "Artist 2",
+    ]
+    cursor = first.headers["X-Next-Cursor"]
+    rest = client.get("/api/artist", params={"limit": 3, "after_id": cursor})
+    assert [row["full_name"] for row in rest.json()] == ["Artist 3", "Artist 4"]
+    assert "X-Next-Cursor" not in rest.headers
+
+    etag = first.headers["ETag"]
+    unchanged = client.get(
+        "/api/artist", params={"limit": 3}, headers={"If-None-Match": etag}
+    )
+    assert unchanged.status_code == 304
+    _create(client, "artist", ARTIST)
+    changed = client.get(
+        "/api/artist", params={"limit": 3}, headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+
+
+def test_filter(client: TestClient) -> None:
+    _create(client, "artist", ARTIST)
+    _create(client, "artist", {**ARTIST, "full_name": "Miles Davis"})
+
+    response = client.get(
+        "/api/db/filter/artist", params={"column": "full_name", "query": "simone"}
+    )
+    assert response.status_code == 200
+    assert [row["full_name"] for row in response.json()] == ["Nina Simone"]
+
+    # An empty query matches every row, so the result is paged.
+    everything = {"column": "full_name", "query": ""}
+    first = client.get("/api/db/filter/artist", params={**everything, "limit": 1})
+    assert [row["full_name"] for row in first.json()] == ["Nina Simone"]
+    cursor = first.headers["X-Next-Cursor"]
+    rest = client.get(
+        "/api/db/filter/artist", params={**everything, "after_id": cursor}
+    )
+    assert [row["full_name"] for row in rest.json()] == ["Miles Davis"]
+
+
+def test_relation_routes(client: TestClient) -> None:
+    artist = _create(client, "artist", ARTIST)
+    performance = _create(client, "performance", PERFORMANCE)
+    link = f"/api/artist/{artist['id']}/performance/{performance['id']}"
+
+    assert client.post(f"{link}/add").status_code == 200
+    assert client.post(f"{link}/add").status_code == 400
+    assert client.post(f"{link}/remove").status_code == 200
+
+    pairs = [
+        {"artist_id": artist["id"], "performance_id": performance["id"]},
+        {"artist_id": artist["id"] + 100, "performance_id": performance["id"]},
+    ]
+    linked = client.post("/api/artist_performance/bulk", json=pairs).json()
+    assert (linked["inserted"], linked["failed"]) == (1, 1)
+    # A repeat shares the outcome of its first occurrence.
+    repeated = client.post("/api/artist_performance/bulk", json=pairs + pairs).json()
+    assert (repeated["skipped"], repeated["failed"]) == (2, 2)
+    assert [error["index"] for error in repeated["errors"]] == [1, 3]
+    unlinked = client.request(
+        "DELETE", "/api/artist_performance/bulk", json=pairs[:1]
+    ).json()
+    assert unlinked["deleted"] == 1
+
+
+def test_import_rejects_constraint_violations(client: TestClient) -> None:
+    records = [ARTIST, {**ARTIST, "organizer_id": 999}, {"full_name": "No genre"}]
+    body = "".join(json.dumps(record) + "\n" for record in records)
+
+    report = client.post(
+        "/api/artist/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    ).json()
+
+    assert (report["inserted"], report["rejected"]) == (1, 2)
+    assert [row["line"] for row in report["rejected_rows"]] == [2, 3]
+    assert "artist_organizer_id_fkey" in report["rejected_rows"][0]["detail"]
@@ -0,0 +1,112 @@
+"""Concurrent /api/ticket/issue calls against one concert program."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+CAPACITY = 25
+CALLS = 40
+
+
+def _program(client: TestClient) -> int:
+    venue = client.post(
+        "/api/venue",
+        json={"name": "Hall", "address": "Main St 1", "capacity": CAPACITY, "type": "hall"},
+    ).json()
+    program = client.post(
+        "/api/concert_program",
+        json={
+            "title": "Opening night",
+            "date": "2030-01-01",
+            "venue_id": venue["id"],
+            "duration": 120,
+            "number_of_performances": 1,
+        },
+    ).json()
+    return program["id"]
+
+
+def _issue_concurrently(client: TestClient, payloads: list[dict]) -> list[int]:
+    """Send every payload at once and return the response status codes."""
+    start = threading.Barrier(len(payloads))
+
+    def issue(payload: dict) -> int:
+        start.wait()
+        return client.post("/api/ticket/issue", json=payload).status_code
+
+    with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+        return list(executor.map(issue, payloads))
+
+
+def _check_invariants(engine: Engine, program_id: int) -> int:
+    """Assert the sales counter and uniqueness guarantees; return tickets sold."""
+    with engine.connect() as connection:
+        sold = connection.scalar(
+            text("SELECT count(*) FROM agency.ticket WHERE concert_program_id = :id"),
+            {"id": program_id},
+        )
+        counted = connection.scalar(
+            text(
+                "SELECT sold FROM agency.ticket_sales WHERE concert_program_id = :id"
+            ),
+            {"id": program_id},
+        )
+        duplicate_places = connection.scalar(
+            text(
+                "SELECT count(*) FROM (SELECT place FROM agency.ticket "
+                "WHERE concert_program_id = :id AND place IS NOT NULL "
+                "GROUP BY place HAVING count(*) > 1) d"
+            ),
+            {"id": program_id},
+        )
+        duplicate_numbers = connection.scalar(
+            text(
+                "SELECT count(*) FROM (SELECT ticket_number FROM agency.ticket "
+                "GROUP BY ticket_number HAVING count(*) > 1) d"
+            )
+        )
+    assert sold <= CAPACITY
+    assert counted == sold
+    assert duplicate_places == 0
+    assert duplicate_numbers == 0
+    return sold
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_concurrent_sales_never_oversell(client: TestClient, clean_db: Engine) -> None:
+    program_id = _program(client)
+    payload = {"concert_program_id": program_id, "price": 50, "quantity": 3}
+
+    statuses = _issue_concurrently(client, [payload] * CALLS)
+
+    assert set(statuses) <= {201, 409}
+    sold = _check_invariants(clean_db, program_id)
+    assert sold == 3 * statuses.count(201) == 3 * (CAPACITY // 3)
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_concurrent_sales_never_sell_a_seat_twice(
+    client: TestClient, clean_db: Engine
+) -> None:
+    program_id = _program(client)
+    # Every call wants two seats, and each seat is wanted by several calls.
+    payloads = [
+        {
+            "concert_program_id": program_id,
+            "price": 50,
+            "places": [f"A{call % 10}", f"A{(call + 1) % 10}"],
+        }
+        for call in range(CALLS)
+    ]
+
+    statuses = _issue_concurrently(client, payloads)
+
+    assert set(statuses) <= {201, 409}
+    sold = _check_invariants(clean_db, program_id)
+    assert sold == 2 * statuses.count(201)